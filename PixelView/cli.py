@@ -62,6 +62,24 @@ def subCommands(subparsers):
     subparser = subparsers.add_parser(command)
     subparser.set_defaults(command=command)
 
+    command = 'cache'
+    subparser = subparsers.add_parser(command, formatter_class=argparse.RawTextHelpFormatter,
+                                      help='Manages the cache of decoded images (decodeCacheDir in the config)')
+    subparser.set_defaults(command=command)
+    subparser.set_defaults(fListVarNameList=['filePathList'])
+    subparser.add_argument('action', choices=['info', 'warm', 'prune'],
+                           help='info:  Display the cache directory and size\n'
+                                'warm:  Decode and cache the images of filePathList\n'
+                                'prune: Evict the least recently used entries until the cache fits in its max size')
+    subparser.add_argument('filePathList', nargs='?', default=[],
+                           help='(warm only) Same as the filePathList of the view command',
+                           type=paramList)
+    subparser.add_argument('--fList', action='store_true',
+                           help='If present, any path provided is treated as a file that contains file paths to images')
+    subparser.add_argument('--cacheDir', help='Cache directory (instead of the one in the config)')
+    subparser.add_argument('--maxSize', help='Max size of the cache in MiB (instead of the one in the config)', type=int)
+    subparser.add_argument('--jobs', help='(warm only) Number of worker processes (0 for one per core)', type=int, default=0)
+
     command = 'view'
     subparser = subparsers.add_parser(command, formatter_class=argparse.RawTextHelpFormatter)
     subparser.set_defaults(command=command)
@@ -74,6 +92,8 @@ def subCommands(subparsers):
                            type=paramList)
     subparser.add_argument('--fList', action='store_true',
                            help='If present, any path provided is treated as a file that contains file paths to images')
+    subparser.add_argument('--fListIndex', action='store_true',
+                           help='If present, an index of each list file is saved beside it (<listFile>.idx.npz) to speed up the next runs')
 
     command = 'compare'
     subparser = subparsers.add_parser(command, formatter_class=argparse.RawTextHelpFormatter)
@@ -83,15 +103,57 @@ def subCommands(subparsers):
                            help='This argument can be either:\n'
                                 '- The file path for the image\n'
                                 '- A commaseparated list of file paths for the images\n'
-                                '- A path of a file that contains file paths for the images (with --fList flag)',
+                                '- A path of a file that contains file paths for the images (with --fList flag)\n'
+                                '- A directory, to compare against the files of the directory given as filePathList2',
+                           type=paramList)
+    subparser.add_argument('filePathList2',
+                           help='Same as filePathList1, but for the second image (or second set of images)',
+                           type=paramList)
+    subparser.add_argument('--fList', action='store_true',
+                           help='If present, any path provided is treated as a file that contains file paths to images')
+    subparser.add_argument('--fListIndex', action='store_true',
+                           help='If present, an index of each list file is saved beside it (<listFile>.idx.npz) to speed up the next runs')
+    subparser.add_argument('--geometry1', help='The area within the image to compare, of the form: <width>x<height>+<x>+<y>', type=Geometry)
+    subparser.add_argument('--geometry2', help='The area within the image to compare, of the form: <width>x<height>+<x>+<y>', type=Geometry)
+    subparser.add_argument('--glob', help='When comparing directories, only the files whose relative path matches this pattern (e.g. "*.png")')
+    subparser.add_argument('--pairKey', help='When comparing directories, regular expression searched in the relative paths\n'
+                                             'Files are paired by its first group (or whole match), instead of by relative path')
+
+    command = 'compareBatch'
+    subparser = subparsers.add_parser(command, formatter_class=argparse.RawTextHelpFormatter,
+                                      help='Compares image pairs without GUI and writes a report\n'
+                                           'Exit code: 0 if all pairs are equal, 1 if any pair is different, 2 on errors')
+    subparser.set_defaults(command=command)
+    subparser.set_defaults(fListVarNameList=['filePathList1', 'filePathList2'])
+    subparser.add_argument('filePathList1',
+                           help='This argument can be either:\n'
+                                '- The file path for the image\n'
+                                '- A commaseparated list of file paths for the images\n'
+                                '- A path of a file that contains file paths for the images (with --fList flag)\n'
+                                '- A directory, to compare against the files of the directory given as filePathList2',
                            type=paramList)
     subparser.add_argument('filePathList2',
                            help='Same as filePathList1, but for the second image (or second set of images)',
                            type=paramList)
     subparser.add_argument('--fList', action='store_true',
                            help='If present, any path provided is treated as a file that contains file paths to images')
+    subparser.add_argument('--fListIndex', action='store_true',
+                           help='If present, an index of each list file is saved beside it (<listFile>.idx.npz) to speed up the next runs')
     subparser.add_argument('--geometry1', help='The area within the image to compare, of the form: <width>x<height>+<x>+<y>', type=Geometry)
     subparser.add_argument('--geometry2', help='The area within the image to compare, of the form: <width>x<height>+<x>+<y>', type=Geometry)
+    subparser.add_argument('--glob', help='When comparing directories, only the files whose relative path matches this pattern (e.g. "*.png")')
+    subparser.add_argument('--pairKey', help='When comparing directories, regular expression searched in the relative paths\n'
+                                             'Files are paired by its first group (or whole match), instead of by relative path')
+    subparser.add_argument('--report', help='Report File Path', dest='reportFilePath', default='report.json')
+    subparser.add_argument('--format', help='Report format (by default from the report file extension)', dest='reportFormat',
+                           choices=['json', 'jsonl', 'csv'])
+    subparser.add_argument('--jobs', help='Number of worker processes (0 for one per core)', type=int, default=0)
+    subparser.add_argument('--unordered', action='store_true',
+                           help='If present, pairs are reported as soon as they are done instead of in list order')
+    subparser.add_argument('--flushInterval', help='Seconds between report file flushes', type=float, default=1.0)
+    subparser.add_argument('--cacheDir', help='Directory of a result cache: pairs whose files did not change since they were\n'
+                                              'compared (with the same arguments) are not compared again')
+    subparser.add_argument('--cacheSize', help='Max size of the result cache in MiB', type=int, default=1024)
 
 
 def run():
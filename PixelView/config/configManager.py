@@ -15,9 +15,11 @@
 
 import os
 import pUtils
+from copy import deepcopy
 from importlib import import_module
 from PixelView.utils.cli import pprint, COLOR
 from PixelView.gui.loadingIndicators.common import SHAPE, DIRECTION
+from PixelView.imageContainers.diffEngine import getColorLut
 
 
 class ConfigManager:
@@ -37,6 +39,8 @@ class ConfigManager:
         self.verbose = verbose
         self.configData = {}
         self.configFilePath = None
+        self.deltaImageColorLut = None
+        self.deltaImageColorLutSource = None
         if self.isUseInternaldefaults is True: return
 
         self.determineConfigFilePath(configFilePath, configName)
@@ -143,9 +147,29 @@ class ConfigManager:
             'getPropShape',
             'getNullColor',
             'getDeltaImageColorDict',
+            'getDeltaTolerance',
             'getPropDy',
             'getMarkerColor',
             'getLoadingIndicatorRefreshRate',
+            'getLoadingIndicatorDelay',
+            'getViewportTileSize',
+            'getViewportTileCacheSize',
+            'getMipmapMemoryBudget',
+            'getResultCacheDir',
+            'getResultCacheSize',
+            'getResultCacheStoreDeltaImages',
+            'getDecodeCacheDir',
+            'getDecodeCacheSize',
+            'getCompareTileHeight',
+            'getCompareWorkerCount',
+            'getProgressiveCompare',
+            'getProgressiveCompareInterval',
+            'getComparePreviewMaxSize',
+            'getMmapLoad',
+            'getLoadingWorkerCount',
+            'getPrefetchNextCount',
+            'getPrefetchPrevCount',
+            'getPrefetchMemoryBudget',
         ]
 
         for funcName in defaultSettingFuncList:
@@ -216,10 +240,90 @@ class ConfigManager:
                             '2': [0x00, 0x00, 0xFF],
                             'default': [0xFF, 0xFF, 0xFF]})
 
+    def getDeltaImageColorLut(self):
+        # The lookup table is compiled once and reused until the color dictionary changes
+        colorDict = self.getDeltaImageColorDict()
+        if self.deltaImageColorLut is None or self.deltaImageColorLutSource != colorDict:
+            self.deltaImageColorLut = getColorLut(colorDict)
+            self.deltaImageColorLutSource = deepcopy(colorDict)
+        return self.deltaImageColorLut
+
+    def getDeltaTolerance(self):
+        # Initial tolerance of the compare view, deltas up to it are not differences
+        return self.getter('deltaTolerance', 0)
+
     def getDeltaImageColor(self, deltaValue):
         t = self.getDeltaImageColorDict()
         return t.get(str(deltaValue), t['default'])
 
+    def getCompareTileHeight(self):
+        return self.getter('compareTileHeight', 256)
+
+    def getCompareWorkerCount(self):
+        # 0 means one worker per available core
+        t = self.getter('compareWorkerCount', 0)
+        if t <= 0:
+            t = os.cpu_count() or 1
+        return t
+
+    def getMmapLoad(self):
+        return self.getter('mmapLoad', True)
+
+    def getLoadingWorkerCount(self):
+        return self.getter('loadingWorkerCount', 2)
+
+    def getPrefetchNextCount(self):
+        return self.getter('prefetchNextCount', 2)
+
+    def getPrefetchPrevCount(self):
+        return self.getter('prefetchPrevCount', 1)
+
+    def getPrefetchMemoryBudget(self):
+        # In MiB
+        return self.getter('prefetchMemoryBudget', 1024)
+
+    def getViewportTileSize(self):
+        return self.getter('viewportTileSize', 512)
+
+    def getViewportTileCacheSize(self):
+        # Tiles kept per panel
+        return self.getter('viewportTileCacheSize', 256)
+
+    def getMipmapMemoryBudget(self):
+        # In MiB
+        return self.getter('mipmapMemoryBudget', 256)
+
+    def getResultCacheDir(self):
+        # None disables the result cache
+        return self.getter('resultCacheDir', None)
+
+    def getResultCacheSize(self):
+        # In MiB
+        return self.getter('resultCacheSize', 1024)
+
+    def getResultCacheStoreDeltaImages(self):
+        return self.getter('resultCacheStoreDeltaImages', True)
+
+    def getDecodeCacheDir(self):
+        # None disables the decode cache
+        return self.getter('decodeCacheDir', None)
+
+    def getDecodeCacheSize(self):
+        # In MiB
+        return self.getter('decodeCacheSize', 4096)
+
+    def getProgressiveCompare(self):
+        # Show a sampled preview and the partial delta image while a pair is compared
+        return self.getter('progressiveCompare', True)
+
+    def getProgressiveCompareInterval(self):
+        # In ms, min time between partial updates
+        return self.getter('progressiveCompareInterval', 100)
+
+    def getComparePreviewMaxSize(self):
+        # Sampled pixels per side of the preview
+        return self.getter('comparePreviewMaxSize', 256)
+
     def getDumpFileName(self):
         return self.getter('dumpFileName', 'dump.json')
 
@@ -238,6 +342,10 @@ class ConfigManager:
     def getLoadingIndicatorRefreshRate(self):
         return self.getter('refreshRate', 100)
 
+    def getLoadingIndicatorDelay(self):
+        # In ms
+        return self.getter('loadingIndicatorDelay', 250)
+
     def getLoadingIndicatorDirection(self):
         default = 3
         try:
@@ -13,26 +13,42 @@
 # limitations under the License.
 
 
-from copy import deepcopy
+import time
 from PySide2.QtCore import Qt
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QFrame, QMessageBox
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QMessageBox, QSpinBox, QComboBox
+from PixelView.gui.futureWatcher import FutureWatcher, ProgressEmitter
+from PixelView.gui.tiledImageView import TiledImageView, ViewSynchronizer
 from PixelView.utils.other import truncateString
-from PixelView.utils.threading import OneShotThread
-from PixelView.utils.image import loadImage, widgetDisplayImage, getAlphaImage
-from PixelView.imageContainers.common import COMPARE_TYPE
+from PixelView.utils.image import loadImage, getAlphaImage
+from PixelView.utils.resultCache import ResultCache, getDiffCacheKey, loadDiffCached, storeDiffCached
+from PixelView.imageContainers.common import COMPARE_TYPE, DELTA_COLOR_MAP
+from PixelView.imageContainers.diffEngine import getColorMapLut
 from PixelView.imageContainers.rgb888Image import Rgb888Image
 
 
 class Compare(QWidget):
-    def __init__(self, configManager, geometry1=None, geometry2=None, parent=None, **kwargs):
+    def __init__(self, configManager, geometry1=None, geometry2=None, workerPool=None, parent=None, **kwargs):
         super(Compare, self).__init__(parent)
 
         self.cm = configManager
+        self.workerPool = workerPool
+        self.requestedGeometry1 = geometry1
+        self.requestedGeometry2 = geometry2
         self.geometry1 = geometry1
         self.geometry2 = geometry2
 
+        self.resultCache = None
+        if self.cm.getResultCacheDir():
+            self.resultCache = ResultCache(self.cm.getResultCacheDir(), self.cm.getResultCacheSize() * 2 ** 20)
+
+        self.rawDiffData = {}
+        self.recolorFuture = None
+        self.recolorWatcher = FutureWatcher(self)
+        self.recolorWatcher.finished.connect(self.recolorDone)
+
         self.initVars()
         self.initLayout()
+        self.updateRecolorControls()
         self.initLoadingIndicator()
 
     def initVars(self):
@@ -65,7 +81,24 @@ class Compare(QWidget):
     def initDifferencesInfoLayout(self):
         layout = QGridLayout()
         self.differentPixelsTotalLabel = QLabel()
-        layout.addWidget(self.differentPixelsTotalLabel, 0, 0, alignment=Qt.AlignRight | Qt.AlignBottom)
+        layout.addWidget(self.differentPixelsTotalLabel, 0, 0, 1, 4, alignment=Qt.AlignRight | Qt.AlignBottom)
+
+        # Both recolor the current result from its delta planes, the pair is not compared again
+        self.toleranceSpinBox = QSpinBox()
+        self.toleranceSpinBox.setRange(0, 254)
+        self.toleranceSpinBox.setValue(self.cm.getDeltaTolerance())
+        self.toleranceSpinBox.valueChanged.connect(self.recolor)
+
+        self.colorMapComboBox = QComboBox()
+        self.colorMapComboBox.addItem('Config colors', DELTA_COLOR_MAP.CONFIG)
+        self.colorMapComboBox.addItem('Heat',          DELTA_COLOR_MAP.HEAT)
+        self.colorMapComboBox.addItem('Binary',        DELTA_COLOR_MAP.BINARY)
+        self.colorMapComboBox.currentIndexChanged.connect(self.recolor)
+
+        layout.addWidget(QLabel('Tolerance:'),  1, 0, alignment=Qt.AlignRight)
+        layout.addWidget(self.toleranceSpinBox, 1, 1)
+        layout.addWidget(QLabel('Colors:'),     1, 2, alignment=Qt.AlignRight)
+        layout.addWidget(self.colorMapComboBox, 1, 3)
         return layout
 
     def initInfoLayout(self):
@@ -84,40 +117,42 @@ class Compare(QWidget):
         return layout
 
     def initImagesLayout(self):
-        def initSubLayout(imageLabel, imagePathLabel):
+        def initSubLayout(imageView, imagePathLabel):
             subLayout = QGridLayout()
-            subLayout.setColumnStretch(1, 9)
-            subLayout.addWidget(imageLabel, 0, 0)
+            subLayout.addWidget(imageView, 0, 0)
             subLayout.addWidget(imagePathLabel, 1, 0, 1, 2, alignment=Qt.AlignRight | Qt.AlignTop)
             return subLayout
 
         layout = QGridLayout()
-        self.imageLabelList = []
+        self.imageViewList = []
         for i in range(6):
-            tLabel = QLabel()
-            tLabel.setFrameStyle(QFrame.Panel | QFrame.Sunken)
-            self.imageLabelList.append(tLabel)
+            tView = TiledImageView(tileSize=self.cm.getViewportTileSize(), tileCacheSize=self.cm.getViewportTileCacheSize(),
+                                   workerPool=self.workerPool)
+            self.imageViewList.append(tView)
+
+        # All the panels share zoom and pan
+        self.viewSynchronizer = ViewSynchronizer(self.imageViewList)
 
         self.imagePath1Label = QLabel()
         self.imagePath2Label = QLabel()
         self.differentPixelsRgbLabel = QLabel()
         self.differentPixelsAlphaLabel = QLabel()
 
-        subLayout = initSubLayout(self.imageLabelList[0], self.imagePath1Label)
-        layout.addLayout(subLayout, 0, 0, alignment=Qt.AlignHCenter | Qt.AlignTop)
+        subLayout = initSubLayout(self.imageViewList[0], self.imagePath1Label)
+        layout.addLayout(subLayout, 0, 0)
 
-        subLayout = initSubLayout(self.imageLabelList[1], self.imagePath2Label)
-        layout.addLayout(subLayout, 0, 1, alignment=Qt.AlignHCenter | Qt.AlignTop)
+        subLayout = initSubLayout(self.imageViewList[1], self.imagePath2Label)
+        layout.addLayout(subLayout, 0, 1)
 
-        subLayout = initSubLayout(self.imageLabelList[2], self.differentPixelsRgbLabel)
-        layout.addLayout(subLayout, 0, 2, alignment=Qt.AlignHCenter | Qt.AlignTop)
+        subLayout = initSubLayout(self.imageViewList[2], self.differentPixelsRgbLabel)
+        layout.addLayout(subLayout, 0, 2)
 
-        layout.addWidget(self.imageLabelList[3], 1, 0, alignment=Qt.AlignHCenter | Qt.AlignTop)
+        layout.addWidget(self.imageViewList[3], 1, 0)
 
-        layout.addWidget(self.imageLabelList[4], 1, 1, alignment=Qt.AlignHCenter | Qt.AlignTop)
+        layout.addWidget(self.imageViewList[4], 1, 1)
 
-        subLayout = initSubLayout(self.imageLabelList[5], self.differentPixelsAlphaLabel)
-        layout.addLayout(subLayout, 1, 2, alignment=Qt.AlignHCenter | Qt.AlignTop)
+        subLayout = initSubLayout(self.imageViewList[5], self.differentPixelsAlphaLabel)
+        layout.addLayout(subLayout, 1, 2)
 
         return layout
 
@@ -129,6 +164,10 @@ class Compare(QWidget):
 
     def initLoadingIndicator(self):
         self.loadingIndicator = self.cm.getLoadingIndicatorClass()(parent=self, configManager=self.cm)
+        self.loadingWatcher = FutureWatcher(self)
+        self.loadingWatcher.finished.connect(self.loadingDone)
+        self.progressEmitter = ProgressEmitter(self)
+        self.progressEmitter.progress.connect(self.loadingProgress)
 
     def pixelIndexToXY(self, pixelIndex, bytesPerPixel, width):
         t = pixelIndex / bytesPerPixel
@@ -137,18 +176,14 @@ class Compare(QWidget):
         return (x, y)
 
     def updateMarker(self):
-        t = deepcopy(self.diffData['deltaImageRgbData'])
-        img3 = Rgb888Image(*t)
-
-        ### Calculate the pixel index for the subImage ###
+        ### Calculate the pixel position within the subImage ###
         x, y = self.pixelIndexToXY(self.pixelIndex1, self.img1.bytesPerPixel, self.img1.width)
         x0 = x - self.geometry1.x
         y0 = y - self.geometry1.y
-        indexTmp = (self.geometry1.width * y0 + x0) * 3
-        ##################################################
+        ########################################################
 
-        img3.data[indexTmp: indexTmp + 3] = self.cm.getMarkerColor()
-        widgetDisplayImage(self.imageLabelList[2], img3)
+        # The marker is drawn over the displayed delta image, which stays untouched
+        self.imageViewList[2].setMarker(x0, y0, self.cm.getMarkerColor())
 
     def updateInfo(self):
         def genHexFormatString(bytesPerPixel):
@@ -226,34 +261,132 @@ class Compare(QWidget):
         self.updateInfo()
         self.updateMarker()
 
-    def loading(self):
+    def isRecolored(self):
+        return self.toleranceSpinBox.value() != 0 or self.colorMapComboBox.currentData() is not DELTA_COLOR_MAP.CONFIG
+
+    def updateRecolorControls(self):
+        # Results cached without their delta planes can't be recolored
+        for widget in [self.toleranceSpinBox, self.colorMapComboBox]:
+            widget.setEnabled('rgbDeltaPlane' in self.rawDiffData)
+
+    def recolor(self):
+        """
+        Applies the tolerance and colors of the controls to the current pair,
+        from the delta planes of its result (nothing is loaded nor compared again)
+        It runs on the worker pool, a new request cancels the previous one if it did not start yet
+        """
+        if 'rgbDeltaPlane' not in self.rawDiffData: return
+
+        colorMap = self.colorMapComboBox.currentData()
+        colorLut = self.cm.getDeltaImageColorLut() if colorMap is DELTA_COLOR_MAP.CONFIG else getColorMapLut(colorMap)
+        img1, img2, rawDiffData, tolerance = self.img1, self.img2, self.rawDiffData, self.toleranceSpinBox.value()
+
+        def recolorFunc():
+            return img1.recolorDiff(img2, rawDiffData, tolerance, colorLut)
+
+        self.cancelRecolor()
+        if self.workerPool is None:
+            self.drawRecolored(recolorFunc())
+            return
+        self.recolorFuture = self.workerPool.submit(recolorFunc)
+        self.recolorWatcher.watch(self.recolorFuture)
+
+    def cancelRecolor(self):
+        if self.recolorFuture is not None: self.recolorFuture.cancel()
+        self.recolorFuture = None
+
+    def recolorDone(self, future):
+        # Only the newest request for the pair on screen is drawn
+        if future is not self.recolorFuture or future.cancelled(): return
+        self.drawRecolored(future.result())
+
+    def drawRecolored(self, diffData):
+        self.diffData = diffData
+
+        # The pixel lists changed, the pixel navigation starts over
+        self.initVars()
+        self.updateInfo()
+        self.imageViewList[2].clearMarker()
+        self.imageViewList[2].setImage(Rgb888Image(*self.diffData['deltaImageRgbData']))
+        if 'alphaDeltaPlane' in self.diffData:
+            self.imageViewList[5].setImage(Rgb888Image(*self.diffData['deltaImageAlphaData']))
+
+    def getBandWorkerCount(self):
+        # compareWorkerCount is shared by all the pairs that can be compared at once (one per loading worker)
+        return max(1, self.cm.getCompareWorkerCount() // self.cm.getLoadingWorkerCount())
+
+    def genProgressFunc(self, imagePath1, imagePath2, img1, img2, img4, img5):
+        """
+        Sends the preview of the pair through self.progressEmitter, then returns the
+        progressFunc for getDiff that sends the partial results (None if not progressiveCompare)
+        """
+        if not self.cm.getProgressiveCompare(): return None
+
+        key = (imagePath1, imagePath2)
+        preview = img1.getDiffPreview(img2, compareType=COMPARE_TYPE.FULL,
+                                      geometry1=self.requestedGeometry1, geometry2=self.requestedGeometry2,
+                                      maxSize=self.cm.getComparePreviewMaxSize(), colorLut=self.cm.getDeltaImageColorLut())
+        if 'deltaImageRgbData' not in preview: return None
+        self.progressEmitter.emit(key, dict(img1=img1, img2=img2, img4=img4, img5=img5, preview=preview))
+
+        lastProgressTime = time.monotonic()
+
+        def progressFunc(progress):
+            nonlocal lastProgressTime
+            if time.monotonic() - lastProgressTime < self.cm.getProgressiveCompareInterval() / 1000: return
+            lastProgressTime = time.monotonic()
+            self.progressEmitter.emit(key, dict(progress=progress))
+        return progressFunc
+
+    def loading(self, imagePath1, imagePath2, **kwargs):
+        """
+        Loads and compares an image pair. Only reads self, so it can run
+        ahead of time for pairs that are not on screen yet
+
+        With progressiveCompare, a sampled preview and then the partial results
+        are sent through self.progressEmitter while the pair is compared
+        (loadingProgress drops the ones of pairs that are not on screen)
+        """
         nullImageData = None
 
         def genNullImageData(refImg):
             if nullImageData: return nullImageData
-            return [bytearray(self.cm.getNullColor() * refImg.width * refImg.height), refImg.width, refImg.height]
-
-        img1 = loadImage(self.imagePath1, self.cm.getNullColor())
-        img2 = loadImage(self.imagePath2, self.cm.getNullColor())
+            return [bytearray(bytes(self.cm.getNullColor()) * (refImg.width * refImg.height)), refImg.width, refImg.height]
+
+        def loadBranch(imagePath):
+            img = loadImage(imagePath, self.cm.getNullColor(), useMmap=self.cm.getMmapLoad())
+            alphaImg = getAlphaImage(img)
+            if alphaImg is None: alphaImg = Rgb888Image(*genNullImageData(img))
+            return img, alphaImg
+
+        # The branches of both images (decode, then alpha) run at once on the shared pool, as the
+        # Pillow decoders and the numpy operations release the GIL. The diff needs both
+        if self.workerPool is None:
+            (img1, img4), (img2, img5) = loadBranch(imagePath1), loadBranch(imagePath2)
+        else:
+            (img1, img4), (img2, img5) = self.workerPool.runInParallel(lambda: loadBranch(imagePath1), lambda: loadBranch(imagePath2))
 
         nullImageData1 = genNullImageData(img1)
-        nullImageData2 = genNullImageData(img2)
-        img4 = getAlphaImage(img1)
-        img5 = getAlphaImage(img2)
-        if img4 is None: img4 = nullImageData1
-        if img5 is None: img5 = nullImageData2
 
         if img1.srcFileFormat == 'nullImage' or img2.srcFileFormat == 'nullImage':
             data = {}
             img3 = None
             img6 = None
         else:
-            data = img1.getDiff(img2, compareType=COMPARE_TYPE.FULL,
-                                returnFailPixelList=True, colorDict=self.cm.getDeltaImageColorDict(),
-                                geometry1=self.geometry1, geometry2=self.geometry2)
-
-            self.geometry1 = data.get('geometry1', self.geometry1)
-            self.geometry2 = data.get('geometry2', self.geometry2)
+            diffKwargs = dict(compareType=COMPARE_TYPE.FULL,
+                              returnFailPixelList=True, colorLut=self.cm.getDeltaImageColorLut(),
+                              geometry1=self.requestedGeometry1, geometry2=self.requestedGeometry2,
+                              returnDeltaPlanes=True)
+            storeArrays = self.cm.getResultCacheStoreDeltaImages()
+
+            # A cached result is shown right away, with no preview
+            key = getDiffCacheKey(self.resultCache, img1, img2, **diffKwargs)
+            data = loadDiffCached(self.resultCache, key, img1, img2, storeArrays)
+            if data is None:
+                data = img1.getDiff(img2, tileHeight=self.cm.getCompareTileHeight(), workerCount=self.getBandWorkerCount(),
+                                    progressFunc=self.genProgressFunc(imagePath1, imagePath2, img1, img2, img4, img5),
+                                    **diffKwargs)
+                storeDiffCached(self.resultCache, key, data, storeArrays)
 
             img3 = Rgb888Image(*data.get('deltaImageRgbData', nullImageData1))
             img6 = Rgb888Image(*data.get('deltaImageAlphaData', nullImageData1))
@@ -267,25 +400,103 @@ class Compare(QWidget):
                           diffData=data)
         return returnData
 
-    def draw(self, imagePath1, imagePath2, index, totalImageSets, **kwargs):
+    def draw(self, imagePath1, imagePath2, index, totalImageSets, loadingFuture, **kwargs):
+        """
+        loadingFuture is the future of self.loading for imagePath1 and imagePath2
+        """
         self.imagePath1 = imagePath1
         self.imagePath2 = imagePath2
         self.index = index
         self.totalImageSets = totalImageSets
+        self.loadingFuture = loadingFuture
+        self.isPreviewDrawn = False
+        self.partialDeltaImage = None
+        self.partialRowsDone = 0
+
+        self.loadingIndicator.start()
+        self.loadingWatcher.watch(self.loadingFuture)
+
+    def loadingProgress(self, key, data):
+        # Progress of prefetched pairs, or of a pair already drawn, is not shown
+        if key != (self.imagePath1, self.imagePath2) or self.loadingFuture.done(): return
+
+        if 'preview' in data:
+            self.loadingIndicator.stop()
+            self.drawPreview(data)
+        elif self.isPreviewDrawn:
+            self.drawProgress(data['progress'])
+
+    def drawPreview(self, data):
+        """
+        Draws both images and the sampled delta image while the pair is compared
+        """
+        preview = data['preview']
 
-        self.loadingThread = OneShotThread(oneShotFunc=self.loading)
-        self.loadingThread.start()
+        self.initVars()
+        self.img1 = data['img1']
+        self.img2 = data['img2']
+        self.rawDiffData = {}
+        self.cancelRecolor()
+        self.updateRecolorControls()
+        self.diffData = {}
+        self.geometry1 = preview['geometry1']
+        self.geometry2 = preview['geometry2']
+        self.isPreviewDrawn = True
 
-        self.loadingIndicator.start(isDoneFunc=lambda: not self.loadingThread.isAlive(),
-                                    postFunc=self.drawPart2)
+        self.updateInfo()
+        self.differentPixelsTotalLabel.setText('Different Pixels Total: ~%i (preview)' % preview['approxPixelDiffCount'])
+        self.differentPixelsRgbLabel.setText(  'Different Pixels (RGB): PENDING')
+        self.differentPixelsAlphaLabel.setText('Different Pixels (Alpha): PENDING')
+
+        origin1 = (self.geometry1.x, self.geometry1.y)
+        origin2 = (self.geometry2.x, self.geometry2.y)
+        self.imageViewList[0].setImage(self.img1,     origin1)
+        self.imageViewList[1].setImage(self.img2,     origin2)
+        self.imageViewList[3].setImage(data['img4'], origin1)
+        self.imageViewList[4].setImage(data['img5'], origin2)
+
+        self.imageViewList[2].clearMarker()
+        self.imageViewList[2].setImage(Rgb888Image(*preview['deltaImageRgbData']), scale=2 ** preview['level'])
+        self.imageViewList[5].setImage(None)
+        for widget in [self.imageViewList[2], self.imageViewList[5], self.differentPixelsTotalLabel,
+                       self.differentPixelsRgbLabel, self.differentPixelsAlphaLabel]:
+            widget.show()
+
+    def drawProgress(self, progress):
+        """
+        Draws the delta image compared so far, over the preview
+        """
+        deltaImageRgb, width, height = progress['deltaImageRgbData']
+        percent = 100 * progress['rowsDone'] // max(height, 1)
+        self.differentPixelsTotalLabel.setText('Different Pixels Total: %i+ (%i%% compared)' % (progress['pixelDiffCount'], percent))
+
+        # The same image all along, only the rows compared since the last update are refreshed
+        if self.partialDeltaImage is None:
+            self.partialDeltaImage = Rgb888Image(deltaImageRgb, width, height)
+            self.imageViewList[2].setImage(self.partialDeltaImage)
+        else:
+            self.imageViewList[2].refreshRows(self.partialRowsDone, progress['rowsDone'])
+        self.partialRowsDone = progress['rowsDone']
+
+    def loadingDone(self, future):
+        # Only the newest request is ever drawn, a cancelled one is followed by a new draw
+        if future is not self.loadingFuture or future.cancelled(): return
+        self.loadingIndicator.stop()
+        self.drawPart2()
 
     def drawPart2(self):
-        data = self.loadingThread.returnData
+        data = self.loadingFuture.result()
 
         self.initVars()
         self.img1 = data.get('img1')
         self.img2 = data.get('img2')
-        self.diffData = data.get('diffData')
+        # The result as compared, recolor derives self.diffData from it
+        self.rawDiffData = data.get('diffData')
+        self.cancelRecolor()
+        self.updateRecolorControls()
+        self.diffData = self.rawDiffData
+        self.geometry1 = self.diffData.get('geometry1', self.requestedGeometry1)
+        self.geometry2 = self.diffData.get('geometry2', self.requestedGeometry2)
 
         img3 = data.get('img3')
         img4 = data.get('img4')
@@ -293,14 +504,17 @@ class Compare(QWidget):
         img6 = data.get('img6')
 
         self.updateInfo()
-        widgetDisplayImage(self.imageLabelList[0], self.img1)
-        widgetDisplayImage(self.imageLabelList[1], self.img2)
-        widgetDisplayImage(self.imageLabelList[3],      img4)
-        widgetDisplayImage(self.imageLabelList[4],      img5)
+        # Panels are aligned on the compared areas
+        origin1 = (self.geometry1.x, self.geometry1.y) if self.geometry1 else (0, 0)
+        origin2 = (self.geometry2.x, self.geometry2.y) if self.geometry2 else (0, 0)
+        self.imageViewList[0].setImage(self.img1, origin1)
+        self.imageViewList[1].setImage(self.img2, origin2)
+        self.imageViewList[3].setImage(     img4, origin1)
+        self.imageViewList[4].setImage(     img5, origin2)
 
         widgetList = [
-            self.imageLabelList[2],
-            self.imageLabelList[5],
+            self.imageViewList[2],
+            self.imageViewList[5],
             self.differentPixelsTotalLabel,
             self.differentPixelsRgbLabel,
             self.differentPixelsAlphaLabel,
@@ -311,13 +525,16 @@ class Compare(QWidget):
                 func = getattr(widget, 'hide')
                 func()
         else:
-            widgetDisplayImage(self.imageLabelList[2], img3)
-            widgetDisplayImage(self.imageLabelList[5], img6)
+            self.imageViewList[2].clearMarker()
+            self.imageViewList[2].setImage(img3)
+            self.imageViewList[5].setImage(img6)
 
             for widget in widgetList:
                 func = getattr(widget, 'show')
                 func()
 
+        if self.isRecolored(): self.recolor()
+
         if self.img1.srcFileFormat == 'nullImage' or self.img2.srcFileFormat == 'nullImage':
             msgBox = QMessageBox(self)
             msgBox.setText('Unable to load the current image pair')
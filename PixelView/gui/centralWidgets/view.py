@@ -13,16 +13,18 @@
 # limitations under the License.
 
 from PySide2.QtCore import Qt
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QLabel, QFrame
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PixelView.gui.futureWatcher import FutureWatcher
+from PixelView.gui.tiledImageView import TiledImageView
 from PixelView.utils.other import truncateString
-from PixelView.utils.threading import OneShotThread
-from PixelView.utils.image import loadImage, widgetDisplayImage
+from PixelView.utils.image import loadImage
 
 
 class View(QWidget):
-    def __init__(self, configManager, parent=None, **kwargs):
+    def __init__(self, configManager, workerPool=None, parent=None, **kwargs):
         super(View, self).__init__(parent)
         self.cm = configManager
+        self.workerPool = workerPool
         self.initLayout()
         self.initLoadingIndicator()
 
@@ -36,11 +38,11 @@ class View(QWidget):
         layout = QVBoxLayout()
         layout.addLayout(self.initInfoLayout())
 
-        self.imageLabel = QLabel()
-        self.imageLabel.setFrameStyle(QFrame.Panel | QFrame.Sunken)
+        self.imageView = TiledImageView(tileSize=self.cm.getViewportTileSize(), tileCacheSize=self.cm.getViewportTileCacheSize(),
+                                        workerPool=self.workerPool)
         self.imagePathLabel = QLabel()
         imageLayout = QVBoxLayout()
-        imageLayout.addWidget(self.imageLabel)
+        imageLayout.addWidget(self.imageView)
         imageLayout.addWidget(self.imagePathLabel, alignment=Qt.AlignRight | Qt.AlignTop)
 
         layout.addLayout(imageLayout)
@@ -48,30 +50,39 @@ class View(QWidget):
 
     def initLoadingIndicator(self):
         self.loadingIndicator = self.cm.getLoadingIndicatorClass()(parent=self, configManager=self.cm)
+        self.loadingWatcher = FutureWatcher(self)
+        self.loadingWatcher.finished.connect(self.loadingDone)
 
     def updateInfo(self):
         self.counterLabel.setText('%i of %i' % (self.index + 1, self.totalImageSets))
         self.imagePathLabel.setText(truncateString(self.imagePath, self.img.width))
 
-    def loading(self):
-        img = loadImage(self.imagePath, self.cm.getNullColor())
+    def loading(self, imagePath1, **kwargs):
+        img = loadImage(imagePath1, self.cm.getNullColor(), useMmap=self.cm.getMmapLoad())
         returnData = dict(img=img)
         return returnData
 
-    def draw(self, imagePath1, index, totalImageSets, **kwargs):
+    def draw(self, imagePath1, index, totalImageSets, loadingFuture, **kwargs):
+        """
+        loadingFuture is the future of self.loading for imagePath1
+        """
         self.imagePath = imagePath1
         self.index = index
         self.totalImageSets = totalImageSets
+        self.loadingFuture = loadingFuture
 
-        self.loadingThread = OneShotThread(oneShotFunc=self.loading)
-        self.loadingThread.start()
+        self.loadingIndicator.start()
+        self.loadingWatcher.watch(self.loadingFuture)
 
-        self.loadingIndicator.start(isDoneFunc=lambda: not self.loadingThread.isAlive(),
-                                    postFunc=self.drawPart2)
+    def loadingDone(self, future):
+        # Only the newest request is ever drawn, a cancelled one is followed by a new draw
+        if future is not self.loadingFuture or future.cancelled(): return
+        self.loadingIndicator.stop()
+        self.drawPart2()
 
     def drawPart2(self):
-        data = self.loadingThread.returnData
+        data = self.loadingFuture.result()
         self.img = data.get('img')
 
         self.updateInfo()
-        widgetDisplayImage(self.imageLabel, data.get('img'))
+        self.imageView.setImage(data.get('img'))
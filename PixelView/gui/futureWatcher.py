@@ -0,0 +1,38 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from PySide2.QtCore import QObject, Signal
+
+
+class FutureWatcher(QObject):
+    """
+    Emits finished(future) in the GUI thread as soon as a watched
+    concurrent.futures.Future is done (right away if it already is)
+    """
+    finished = Signal(object)
+
+    def watch(self, future):
+        # The callback runs in the worker thread, the signal is queued to the GUI thread
+        future.add_done_callback(self.finished.emit)
+
+
+class ProgressEmitter(QObject):
+    """
+    Forwards progress(key, data) to the GUI thread, emit can be called from any thread
+    """
+    progress = Signal(object, object)
+
+    def emit(self, key, data):
+        self.progress.emit(key, data)
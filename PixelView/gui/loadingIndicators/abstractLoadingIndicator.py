@@ -15,7 +15,7 @@
 
 from PySide2.QtWidgets import QWidget
 from PySide2.QtGui import QPainter, QBrush, QColor
-from PySide2.QtCore import QRect, QPoint, QSize, Qt
+from PySide2.QtCore import QRect, QPoint, QSize, QTimer, Qt
 from PixelView.utils.cli import pprint
 from PixelView.gui.loadingIndicators.common import SHAPE, DIRECTION
 
@@ -53,6 +53,7 @@ class AbstractLoadingIndicator(QWidget):
         super(AbstractLoadingIndicator, self).__init__(parent)
         self.palette().setColor(self.palette().Background, Qt.transparent)
         self.initVars(parent, **kwargs)
+        self.hide()
 
     def initVars(self, parent, configManager, **kwargs):
         self.cm = configManager
@@ -61,6 +62,12 @@ class AbstractLoadingIndicator(QWidget):
         self.counter = 0
         self.refreshRate = self.cm.getLoadingIndicatorRefreshRate()
 
+        # The indicator only shows up for the tasks that last longer than the delay
+        self.delayTimer = QTimer(self)
+        self.delayTimer.setSingleShot(True)
+        self.delayTimer.setInterval(self.cm.getLoadingIndicatorDelay())
+        self.delayTimer.timeout.connect(self.show)
+
         self.prop = Prop()
         self.prop.dx = self.cm.getPropDx()
         self.prop.dy = self.cm.getPropDy()
@@ -73,18 +80,15 @@ class AbstractLoadingIndicator(QWidget):
         self.direction = self.cm.getLoadingIndicatorDirection()
         self.tmpIncr = 1
 
-        self.postFunc = None
-
-    def paintEvent(self, event):
-        painter = QPainter()
-        painter.begin(self)
+    def getCenter(self):
+        return QPoint(self.width() / 2, self.height() / 2)
 
-        center = QPoint(self.width() / 2, self.height() / 2)
+    def getIconRect(self):
+        """
+        Returns the rectangle where the loading icon is displayed
+        """
+        center = self.getCenter()
 
-        # Dim out the background
-        painter.fillRect(self.rect(), QBrush(QColor(255, 255, 255, 160)))
-
-        ### Add a black rectangle where the loading icon would be displayed ###
         startPos = QPoint(min([i.x() for i in self.posList]),
                           min([i.y() for i in self.posList]))
         endPos   = QPoint(max([i.x() for i in self.posList]),
@@ -99,8 +103,19 @@ class AbstractLoadingIndicator(QWidget):
         size = QSize(delta.x() * self.spacing.x() + 2 * self.prop.dx + 2 * marginX,
                      delta.y() * self.spacing.y() + 2 * self.prop.dy + 2 * marginY)
 
-        painter.fillRect(QRect(origin, size), QColor(0, 0, 0, 255))
-        #######################################################################
+        return QRect(origin, size)
+
+    def paintEvent(self, event):
+        painter = QPainter()
+        painter.begin(self)
+
+        center = self.getCenter()
+
+        # Dim out the background
+        painter.fillRect(self.rect(), QBrush(QColor(255, 255, 255, 160)))
+
+        # Add a black rectangle where the loading icon would be displayed
+        painter.fillRect(self.getIconRect(), QColor(0, 0, 0, 255))
 
         for i in range(len(self.posList)):
             pos = self.posList[i]
@@ -142,20 +157,20 @@ class AbstractLoadingIndicator(QWidget):
         pprint('WARNING: direction "%s" not known' % str(self.direction))
         return self.counterForward
 
-    def isDoneFunc(self):
-        return False
-
     def timerEvent(self, event):
-        if self.isDoneFunc():
-            self.hide()
-            self.postFunc()
-            return
-        self.update()
-
-    def start(self, isDoneFunc, postFunc):
-        self.isDoneFunc = isDoneFunc
-        self.postFunc = postFunc
-        self.show()
+        # Only the icon changes between frames
+        self.update(self.getIconRect())
+
+    def start(self):
+        """
+        Shows the indicator once the loading indicator delay elapses, unless stop is called first
+        """
+        if self.isVisible() or self.delayTimer.isActive(): return
+        self.delayTimer.start()
+
+    def stop(self):
+        self.delayTimer.stop()
+        self.hide()
 
     def showEvent(self, event):
         self.resize(self.parent.width(), self.parent.height())
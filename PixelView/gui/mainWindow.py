@@ -19,6 +19,9 @@ import pUtils
 from PySide2.QtWidgets import QApplication, QMainWindow, QMenuBar, QAction, QMessageBox
 from PixelView.gui.centralWidgets.view import View
 from PixelView.gui.centralWidgets.compare import Compare
+from PixelView.utils.prefetch import PrefetchCache
+from PixelView.utils.threading import WorkerPool
+from PixelView.imageContainers.mipmap import mipmapCache
 
 
 @enum.unique
@@ -52,10 +55,16 @@ class MainWindow(QMainWindow):
         self.pixelIndex1 = 0
         self.pixelIndex2 = 0
 
+        mipmapCache.memoryBudget = self.cm.getMipmapMemoryBudget() * 2 ** 20
+
+        self.workerPool = WorkerPool(workerCount=self.cm.getLoadingWorkerCount())
+        self.prefetchCache = PrefetchCache(memoryBudget=self.cm.getPrefetchMemoryBudget() * 2 ** 20,
+                                           workerPool=self.workerPool)
+
         self.mode = mode
         self.centralWidgetDict = {
-            MAIN_WINDOW_MODE.VIEW:    View(configManager=configManager, **kwargs),
-            MAIN_WINDOW_MODE.COMPARE: Compare(configManager=configManager, **kwargs),
+            MAIN_WINDOW_MODE.VIEW:    View(configManager=configManager, workerPool=self.workerPool, **kwargs),
+            MAIN_WINDOW_MODE.COMPARE: Compare(configManager=configManager, workerPool=self.workerPool, **kwargs),
         }
 
     def initMenuBar(self, mode=None):
@@ -70,6 +79,7 @@ class MainWindow(QMainWindow):
 
     def dropImage(self):
         if len(self.imagePathList1) == 1: return
+        self.prefetchCache.invalidate(self.getCacheKey(self.index))
         self.droppedList1.append(self.imagePathList1.pop(self.index))
         if self.imagePathList2:
             self.droppedList2.append(self.imagePathList2.pop(self.index))
@@ -172,14 +182,42 @@ class MainWindow(QMainWindow):
             viewMenu.addAction(prevDiffPixelAction)
         return menuBar
 
-    def draw(self):
-        imagePath1 =  self.imagePathList1[self.index]
+    def getImagePathPair(self, index):
+        imagePath1 = self.imagePathList1[index]
         imagePath2 = ''
-        if self.imagePathList2: imagePath2 = self.imagePathList2[self.index]
+        if self.imagePathList2: imagePath2 = self.imagePathList2[index]
+        return imagePath1, imagePath2
+
+    def getCacheKey(self, index):
+        return (self.mode,) + self.getImagePathPair(index)
+
+    def genLoadFunc(self, index):
+        imagePath1, imagePath2 = self.getImagePathPair(index)
+        loadingFunc = self.centralWidget().loading
+        return lambda: loadingFunc(imagePath1=imagePath1, imagePath2=imagePath2)
+
+    def prefetchNeighbours(self):
+        nextCount = self.cm.getPrefetchNextCount()
+        prevCount = self.cm.getPrefetchPrevCount()
+
+        # Nearest first, alternating forward and backward
+        indexList = []
+        for i in range(1, max(nextCount, prevCount) + 1):
+            if i <= nextCount and self.index + i < len(self.imagePathList1): indexList.append(self.index + i)
+            if i <= prevCount and self.index - i >= 0: indexList.append(self.index - i)
+
+        self.prefetchCache.prefetch([[self.getCacheKey(i), self.genLoadFunc(i)] for i in indexList],
+                                    protectedKeyList=[self.getCacheKey(self.index)])
+
+    def draw(self):
+        imagePath1, imagePath2 = self.getImagePathPair(self.index)
+        loadingFuture = self.prefetchCache.get(self.getCacheKey(self.index), self.genLoadFunc(self.index))
         self.centralWidget().draw(imagePath1=imagePath1,
                                   imagePath2=imagePath2,
                                   index=self.index,
-                                  totalImageSets=len(self.imagePathList1))
+                                  totalImageSets=len(self.imagePathList1),
+                                  loadingFuture=loadingFuture)
+        self.prefetchNeighbours()
 
 
 def launch(configManager, imagePathList1, imagePathList2=[], mode=MAIN_WINDOW_MODE.VIEW, **kwargs):
@@ -0,0 +1,249 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import math
+import numpy as np
+from collections import OrderedDict
+from PySide2.QtCore import Qt, QRectF, QPointF, Signal
+from PySide2.QtGui import QImage, QPixmap, QPainter, QColor, QBrush
+from PySide2.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsRectItem, QFrame
+from PixelView.gui.futureWatcher import FutureWatcher
+
+
+# Alpha is not displayed (RGBX)
+QIMAGE_FORMAT_DICT = {
+    'RGB':  QImage.Format_RGB888,
+    'RGBA': QImage.Format_RGBX8888,
+    'L':    QImage.Format_Grayscale8,
+}
+
+
+class TiledImageItem(QGraphicsItem):
+    """
+    Graphics item displaying an image in tiles of tileSize x tileSize pixels
+    Tiles are taken from the coarsest mipmap level good enough for the current
+    zoom. Only the exposed tiles are converted to pixmaps, the last tileCacheSize
+    of them are kept for the next repaints
+
+    With a workerPool, missing mipmap levels are built on it (never while painting),
+    the nearest level already built being drawn in the meantime
+    """
+
+    def __init__(self, tileSize, tileCacheSize, workerPool=None, parent=None):
+        super(TiledImageItem, self).__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.tileSize = tileSize
+        self.tileCacheSize = tileCacheSize
+        self.tileCache = OrderedDict()
+        self.img = None
+
+        self.workerPool = workerPool
+        self.pendingLevelDict = {}
+        self.levelWatcher = FutureWatcher()
+        self.levelWatcher.finished.connect(self.levelReady)
+
+    def setImage(self, img):
+        self.prepareGeometryChange()
+        self.img = img
+        self.tileCache.clear()
+        self.pendingLevelDict = {}
+        self.update()
+
+    def refreshRows(self, rowStart, rowEnd):
+        """
+        Redraws rows rowStart to rowEnd of the image, after its data changed there
+        """
+        if self.img is None: return
+        self.img.refreshMipmapRows(rowStart, rowEnd)
+        for level, tileX, tileY in list(self.tileCache.keys()):
+            levelTileSize = self.tileSize * 2 ** level
+            if tileY * levelTileSize < rowEnd and (tileY + 1) * levelTileSize > rowStart:
+                del self.tileCache[(level, tileX, tileY)]
+        self.update(QRectF(0, rowStart, self.img.width, rowEnd - rowStart))
+
+    def getLevelArray(self, level):
+        """
+        Returns (level, array), the mipmap level to draw when level is wanted
+        """
+        if self.workerPool is None: return level, self.img.getMipmapLevel(level)
+
+        cachedLevel, array = self.img.getNearestCachedMipmapLevel(level)
+        if cachedLevel != level and level not in self.pendingLevelDict:
+            img = self.img
+            future = self.workerPool.submit(lambda: img.getMipmapLevel(level))
+            self.pendingLevelDict[level] = future
+            self.levelWatcher.watch(future)
+        return cachedLevel, array
+
+    def levelReady(self, future):
+        # Builds for a previous image are not in pendingLevelDict anymore
+        for level, t in list(self.pendingLevelDict.items()):
+            if t is future:
+                del self.pendingLevelDict[level]
+                self.update()
+
+    def boundingRect(self):
+        if self.img is None: return QRectF()
+        return QRectF(0, 0, self.img.width, self.img.height)
+
+    def getTilePixmap(self, level, levelArray, tileX, tileY):
+        key = (level, tileX, tileY)
+        pixmap = self.tileCache.get(key)
+        if pixmap is not None:
+            self.tileCache.move_to_end(key)
+            return pixmap
+
+        x = tileX * self.tileSize
+        y = tileY * self.tileSize
+        tile = np.ascontiguousarray(levelArray[y: y + self.tileSize, x: x + self.tileSize])
+        height, width, bytesPerPixel = tile.shape
+        qImage = QImage(tile.data, width, height, width * bytesPerPixel, QIMAGE_FORMAT_DICT[self.img.mode])
+        pixmap = QPixmap.fromImage(qImage)
+
+        self.tileCache[key] = pixmap
+        while len(self.tileCache) > self.tileCacheSize:
+            self.tileCache.popitem(last=False)
+        return pixmap
+
+    def paint(self, painter, option, widget=None):
+        if self.img is None: return
+
+        exposedRect = option.exposedRect.intersected(self.boundingRect())
+        if exposedRect.isEmpty(): return
+
+        level, levelArray = self.getLevelArray(self.img.getMipmapLevelForScale(option.levelOfDetailFromTransform(painter.worldTransform())))
+        levelTileSize = self.tileSize * 2 ** level
+
+        tileXStart = int(exposedRect.left()) // levelTileSize
+        tileYStart = int(exposedRect.top()) // levelTileSize
+        tileXEnd = math.ceil(exposedRect.right() / levelTileSize)
+        tileYEnd = math.ceil(exposedRect.bottom() / levelTileSize)
+
+        # Edge pixels of the coarser levels may reach past the image
+        painter.setClipRect(self.boundingRect())
+        for tileY in range(tileYStart, tileYEnd):
+            for tileX in range(tileXStart, tileXEnd):
+                pixmap = self.getTilePixmap(level, levelArray, tileX, tileY)
+                targetRect = QRectF(tileX * levelTileSize, tileY * levelTileSize,
+                                    pixmap.width() * 2 ** level, pixmap.height() * 2 ** level)
+                painter.drawPixmap(targetRect, pixmap, QRectF(pixmap.rect()))
+
+
+class TiledImageView(QGraphicsView):
+    """
+    Zoomable (mouse wheel) and pannable (drag) view of a single image
+    A double click goes back to 1:1. viewChanged is emitted whenever the
+    zoom or the visible area change.
+
+    origin is the position of the image, in image pixels, that the panels
+    of a ViewSynchronizer group consider as their common (0, 0)
+    """
+    viewChanged = Signal()
+
+    def __init__(self, tileSize=512, tileCacheSize=256, workerPool=None, parent=None):
+        super(TiledImageView, self).__init__(parent)
+        self.zoom = 1.0
+        self.minZoom = 1 / 64
+        self.maxZoom = 64
+        self.origin = QPointF(0, 0)
+
+        self.setScene(QGraphicsScene(self))
+        self.setFrameStyle(QFrame.Panel | QFrame.Sunken)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setBackgroundBrush(QBrush(Qt.darkGray))
+
+        self.imageItem = TiledImageItem(tileSize, tileCacheSize, workerPool)
+        self.scene().addItem(self.imageItem)
+
+        self.markerItem = QGraphicsRectItem(0, 0, 1, 1)
+        self.markerItem.setPen(Qt.NoPen)
+        self.markerItem.setZValue(1)
+        self.markerItem.hide()
+        self.scene().addItem(self.markerItem)
+
+        self.horizontalScrollBar().valueChanged.connect(self.viewChanged)
+        self.verticalScrollBar().valueChanged.connect(self.viewChanged)
+
+    def setImage(self, img, origin=(0, 0), scale=1):
+        """
+        scale is the size of every pixel of img, for images standing for a larger one
+        (e.g. a compare preview)
+        """
+        self.imageItem.setImage(img)
+        self.imageItem.setScale(scale)
+        self.origin = QPointF(*origin)
+        self.scene().setSceneRect(self.imageItem.sceneBoundingRect())
+
+    def refreshRows(self, rowStart, rowEnd):
+        self.imageItem.refreshRows(rowStart, rowEnd)
+
+    def setMarker(self, x, y, color):
+        self.markerItem.setRect(x, y, 1, 1)
+        self.markerItem.setBrush(QColor(*color))
+        self.markerItem.show()
+
+    def clearMarker(self):
+        self.markerItem.hide()
+
+    def setZoom(self, zoom):
+        zoom = min(max(zoom, self.minZoom), self.maxZoom)
+        if zoom == self.zoom: return
+        self.scale(zoom / self.zoom, zoom / self.zoom)
+        self.zoom = zoom
+
+        # Smoothing only when zooming out, zoomed in pixels must stay sharp
+        self.setRenderHint(QPainter.SmoothPixmapTransform, self.zoom < 1)
+        self.viewChanged.emit()
+
+    def getCenter(self):
+        """
+        Returns the image position at the center of the view, relative to origin
+        """
+        return self.mapToScene(self.viewport().rect().center()) - self.origin
+
+    def setCenter(self, center):
+        self.centerOn(center + self.origin)
+
+    def wheelEvent(self, event):
+        self.setZoom(self.zoom * 1.25 ** (event.angleDelta().y() / 120))
+
+    def mouseDoubleClickEvent(self, event):
+        self.setZoom(1.0)
+
+
+class ViewSynchronizer:
+    """
+    Keeps the zoom and the center of a group of TiledImageViews in sync
+    """
+
+    def __init__(self, viewList):
+        self.viewList = viewList
+        self.isSyncing = False
+        for view in self.viewList:
+            view.viewChanged.connect(lambda view=view: self.sync(view))
+
+    def sync(self, srcView):
+        if self.isSyncing: return
+        self.isSyncing = True
+        try:
+            center = srcView.getCenter()
+            for view in self.viewList:
+                if view is srcView: continue
+                view.setZoom(srcView.zoom)
+                view.setCenter(center)
+        finally:
+            self.isSyncing = False
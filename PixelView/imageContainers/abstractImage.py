@@ -14,13 +14,21 @@
 
 
 import os
+import math
+import numpy as np
 from copy import deepcopy
-from .common import Geometry, COMPARE_TYPE
+from .common import Geometry, COMPARE_TYPE, DIFF_ENGINE
+from .diffPixelList import DiffPixelList
+from .mipmap import mipmapCache, getLevelForScale
+from .diffEngine import applyTolerance, compareArrays, concatenate, findFirstRawDiff, getArrayStats, getDefaultTileHeight, getColorLut, getDiffPositionArray, getPixelIndexPair, iterRowBands, mapRowBands
 
 
 class AbstractImage(object):
     def __init__(self, data, width, height):
-        self.data = bytearray(data)
+        # bytearray and memoryview (e.g. memory mapped) data is used as is, not copied
+        if not isinstance(data, (bytearray, memoryview)):
+            data = bytearray(data)
+        self.data = data
 
         self.width = width
         self.height = height
@@ -29,9 +37,7 @@ class AbstractImage(object):
         self.srcFileFormat = None
 
     def getImageInfo(self):
-        t = deepcopy(self.__dict__)
-        t.pop('data')
-        return t
+        return deepcopy({key: value for key, value in self.__dict__.items() if key != 'data'})
 
     def getImageName(self):
         if self.filePath: return os.path.basename(self.filePath)
@@ -41,7 +47,89 @@ class AbstractImage(object):
         return (geometry.width  + geometry.x <= self.width and
                 geometry.height + geometry.y <= self.height)
 
-    def getDiff(self, other, geometry1=None, geometry2=None, stopOnDiff=False, compareType=COMPARE_TYPE.FULL, returnFailPixelList=False, colorDict=None):
+    def getPixelArray(self, geometry=None):
+        """
+        Returns a (height, width, bytesPerPixel) numpy view of the image data (no copy is made)
+        If geometry is provided, the view only covers that area of the image
+        """
+        size = self.width * self.height * self.bytesPerPixel
+        t = np.frombuffer(self.data, dtype=np.uint8, count=size).reshape(self.height, self.width, self.bytesPerPixel)
+        if geometry is None: return t
+        return t[geometry.y:geometry.y + geometry.height, geometry.x:geometry.x + geometry.width]
+
+    def getMipmapLevel(self, level):
+        """
+        Returns level of the mipmap pyramid of the image, a (ceil(height / 2^level),
+        ceil(width / 2^level), bytesPerPixel) array. Level 0 is getPixelArray().
+        Levels are built on demand (2x2 box filter) and cached in mipmapCache
+        """
+        return mipmapCache.getLevel(self, level)
+
+    def refreshMipmapRows(self, rowStart, rowEnd):
+        """
+        Updates the cached mipmap levels after rows rowStart to rowEnd of the data changed
+        """
+        mipmapCache.refreshRows(self, rowStart, rowEnd)
+
+    def getNearestCachedMipmapLevel(self, level):
+        """
+        Returns (cachedLevel, array), the already built mipmap level nearest to
+        level (level 0 if none is). Unlike getMipmapLevel it never builds a level
+        """
+        return mipmapCache.getNearestCachedLevel(self, level)
+
+    def getMipmapLevelForScale(self, scale):
+        """
+        Returns the coarsest mipmap level good enough to display the image at scale
+        """
+        return getLevelForScale(scale, self.width, self.height)
+
+    def checkDiffArgs(self, other, geometry1, geometry2, compareType):
+        """
+        Validates the arguments shared by getDiff and getDiffStats
+
+        Returns:
+            If the images can't be compared as requested, the dictionary getDiff returns
+            for that case (it has the item 'isDiff').
+            Otherwise a dictionary with the resolved 'geometry1' and 'geometry2' and
+            'flagCompareAlpha' (whether the alpha channel takes part in the comparison)
+        """
+        if geometry1 is None:
+            geometry1 = Geometry(0, 0, self.width, self.height)
+        else:
+            geometry1 = Geometry(geometry1)
+
+        if geometry2 is None:
+            geometry2 = Geometry(0, 0, other.width, other.height)
+        else:
+            geometry2 = Geometry(geometry2)
+
+        if not geometry1.isAreaEqual(geometry2):
+            return {'isDiff': True, 'debugData': {'msg': 'Geometry mismatch', 'geometry1': str(geometry1), 'geometry2': str(geometry2)}}
+
+        if (not self.validateGeometry(geometry1) or not other.validateGeometry(geometry2)):
+            return {'isDiff': True, 'debugData': {'msg': 'Invalid geometry',
+                                                  'geometry1': str(geometry1), 'geometry2': str(geometry2),
+                                                  'width1': str(self.width), 'width2': str(other.width),
+                                                  'height1': str(self.height), 'height2': str(other.height)}}
+
+        if (((compareType is COMPARE_TYPE.ALPHA_HI1 or compareType is COMPARE_TYPE.ALPHA_LO1) and self.bytesPerPixel != 4) or
+            ((compareType is COMPARE_TYPE.ALPHA_HI2 or compareType is COMPARE_TYPE.ALPHA_LO2) and other.bytesPerPixel != 4)):
+            return {'isDiff': True, 'debugData': {'msg': 'Invalid image format and comparison type combo',
+                                                  'compareType': str(compareType),
+                                                  'bytesPerPixel1': self.bytesPerPixel, 'bytesPerPixel2': other.bytesPerPixel}}
+
+        flagCompareAlpha = False
+        if compareType is COMPARE_TYPE.FULL:
+            if (self.bytesPerPixel == 4)  != (other.bytesPerPixel == 4):
+                return {'isDiff': True, 'debugData': {'msg': 'Alpha in only one of the images',
+                                                      'bytesPerPixel1': self.bytesPerPixel, 'bytesPerPixel2': other.bytesPerPixel}}
+            if (self.bytesPerPixel == 4) and (other.bytesPerPixel == 4): flagCompareAlpha = True
+
+        return {'geometry1': geometry1, 'geometry2': geometry2, 'flagCompareAlpha': flagCompareAlpha}
+
+    def getDiff(self, other, geometry1=None, geometry2=None, stopOnDiff=False, compareType=COMPARE_TYPE.FULL, returnFailPixelList=False, colorDict=None, engine=DIFF_ENGINE.NUMPY,
+                tileHeight=None, workerCount=1, colorLut=None, progressFunc=None, returnDeltaPlanes=False):
         """
         Compares two images: self vs other
 
@@ -50,6 +138,8 @@ class AbstractImage(object):
             geometry1: The rectangular area within the 'self' image to compare
             geometry2: The rectangular area within the 'other' image to compare
             stopOnDiff: If True, return as soon as the first pixel difference is detected.
+                        (the return dictionary then includes 'firstDiffPixel', the
+                        [pixelIndex1, pixelIndex2] of that pixel)
                         If False, continue comparing the image until the end
             compareType: What type of comparison to perform for details see the
                          COMPARE_TYPE enum above
@@ -57,6 +147,24 @@ class AbstractImage(object):
                                  that was found different in the comparison.
                                  If false, don't return nor collect this data.
             colorDict: A dictionary with the colors to use for the deltaImages.
+            engine: Which implementation performs the comparison, for details see the
+                    DIFF_ENGINE enum. All of them return the same results.
+            tileHeight: (NUMPY engine only) Compare the area in bands of this many rows,
+                        so the memory used for temporaries depends on the band size
+                        and not on the image size. If None, bands of about 1M pixels are used.
+            workerCount: (NUMPY engine only) How many threads compare bands concurrently
+            colorLut: (NUMPY engine only) The colors for the deltaImages already compiled
+                      into a (256, 3) lookup table (see diffEngine.getColorLut).
+                      If provided, colorDict is not used.
+            progressFunc: (NUMPY engine only) Called as progressFunc(progress) every time a band
+                          is done, in band order. progress is a dictionary with:
+                              'rowsDone':          How many rows of the area are compared so far
+                              'pixelDiffCount':    How many pixels were different so far
+                              'deltaImageRgbData': The delta image for the RGB channels being
+                                                   filled (rows past rowsDone are still black)
+            returnDeltaPlanes: (NUMPY engine only) If True, also return the per pixel deltas
+                               ('rgbDeltaPlane' and 'alphaDeltaPlane'), so the result can be
+                               recolored with another tolerance (see recolorDiff)
 
         Returns:
             A dictionary that always has the item 'isDiff', and additional data depending
@@ -80,37 +188,308 @@ class AbstractImage(object):
                 'maxChannelDelta':    The max difference found in a channel
                 'diffPixelRgbList':   The list of pixels that were different for the RGB channels
                 'diffPixelAlphaList': The list of pixels that were different for the alpha channel
+                                      (Both are DiffPixelList, whose entries are the [pixelIndex1, pixelIndex2]
+                                      pair of each pixel)
+                'rgbDeltaPlane':      (returnDeltaPlanes only) (height, width) uint8 array with the max
+                                      delta of the RGB channels of every pixel
+                'alphaDeltaPlane':    (returnDeltaPlanes only) Same for the alpha channel
         """
-        if geometry1 is None:
-            geometry1 = Geometry(0, 0, self.width, self.height)
-        else:
-            geometry1 = Geometry(geometry1)
+        t = self.checkDiffArgs(other, geometry1, geometry2, compareType)
+        if 'isDiff' in t: return t
+        geometry1, geometry2, flagCompareAlpha = t['geometry1'], t['geometry2'], t['flagCompareAlpha']
 
-        if geometry2 is None:
-            geometry2 = Geometry(0, 0, other.width, other.height)
-        else:
-            geometry2 = Geometry(geometry2)
+        args = (other, geometry1, geometry2, stopOnDiff, compareType, returnFailPixelList, colorDict, flagCompareAlpha)
+        if engine is DIFF_ENGINE.REFERENCE:
+            return self.getDiffReference(*args)
+        return self.getDiffNumpy(*args, tileHeight=tileHeight, workerCount=workerCount, colorLut=colorLut, progressFunc=progressFunc,
+                                 returnDeltaPlanes=returnDeltaPlanes)
 
-        if not geometry1.isAreaEqual(geometry2):
-            return {'isDiff': True, 'debugData': {'msg': 'Geometry mismatch', 'geometry1': str(geometry1), 'geometry2': str(geometry2)}}
+    def getDiffStats(self, other, geometry1=None, geometry2=None, compareType=COMPARE_TYPE.FULL, tileHeight=None, workerCount=1):
+        """
+        Statistics only version of getDiff: no delta images nor pixel lists are built
+        The area is processed in bands of tileHeight rows (by default bands of about 1M pixels),
+        so the memory used does not depend on the image size
 
-        if (not self.validateGeometry(geometry1) or not other.validateGeometry(geometry2)):
-            return {'isDiff': True, 'debugData': {'msg': 'Invalid geometry',
-                                                  'geometry1': str(geometry1), 'geometry2': str(geometry2),
-                                                  'width1': str(self.width), 'width2': str(other.width),
-                                                  'height1': str(self.height), 'height2': str(other.height)}}
+        Returns:
+            Same as getDiff when the images can't be compared, otherwise a dictionary with:
+
+                'isDiff':                Whether any compared pixel was different
+                'pixelDiffCount':        How may pixels were different
+                'absDiffCount':          The sum of the differences per channel of every pixel compared
+                'maxChannelDelta':       The max difference found in a channel
+                'comparedPixelCount':    How many pixels were compared (pixels masked out by compareType are not)
+                'channelDeltaHistogram': One list of 256 counts per compared channel (R, G, B and A if
+                                         the alpha is compared) with how many times each delta was found
+                'mse':                   Mean squared error over the compared channels
+                'psnr':                  Peak signal to noise ratio in dB (inf if there are no differences)
+        """
+        t = self.checkDiffArgs(other, geometry1, geometry2, compareType)
+        if 'isDiff' in t: return t
+        geometry1, geometry2, flagCompareAlpha = t['geometry1'], t['geometry2'], t['flagCompareAlpha']
+
+        if tileHeight is None:
+            tileHeight = getDefaultTileHeight(geometry1.width)
+
+        def compareTile(rowStart, rowEnd):
+            tileGeometry1 = Geometry(geometry1.x, geometry1.y + rowStart, geometry1.width, rowEnd - rowStart)
+            tileGeometry2 = Geometry(geometry2.x, geometry2.y + rowStart, geometry1.width, rowEnd - rowStart)
+            return getArrayStats(self.getPixelArray(tileGeometry1), other.getPixelArray(tileGeometry2), compareType, flagCompareAlpha)
+
+        pixelDiffCount = 0
+        comparedPixelCount = 0
+        channelDeltaHistogram = np.zeros((4 if flagCompareAlpha else 3, 256), dtype=np.int64)
+        for t in mapRowBands(compareTile, geometry1.height, tileHeight, workerCount):
+            pixelDiffCount += t['pixelDiffCount']
+            comparedPixelCount += t['comparedPixelCount']
+            channelDeltaHistogram += t['channelDeltaHistogram']
+
+        deltaArray = np.arange(256)
+        absDiffCount = int((channelDeltaHistogram * deltaArray).sum())
+        squaredDiffCount = int((channelDeltaHistogram * deltaArray ** 2).sum())
+        maxChannelDelta = int(np.flatnonzero(channelDeltaHistogram.sum(axis=0)).max(initial=0))
+
+        channelCount = comparedPixelCount * channelDeltaHistogram.shape[0]
+        mse = squaredDiffCount / channelCount if channelCount else 0.0
+        psnr = 10 * math.log10(255 ** 2 / mse) if mse else math.inf
+
+        return {'isDiff':                pixelDiffCount != 0,
+                'pixelDiffCount':        pixelDiffCount,
+                'absDiffCount':          absDiffCount,
+                'maxChannelDelta':       maxChannelDelta,
+                'comparedPixelCount':    comparedPixelCount,
+                'channelDeltaHistogram': channelDeltaHistogram.tolist(),
+                'mse':                   mse,
+                'psnr':                  psnr,
+                'geometry1':             geometry1,
+                'geometry2':             geometry2}
+
+    def getDiffPreview(self, other, geometry1=None, geometry2=None, compareType=COMPARE_TYPE.FULL, maxSize=256, colorLut=None):
+        """
+        Quick approximation of getDiff, meant to be shown while getDiff runs
+        Only a regular grid of pixels (one every 2^level pixels in each direction, so that
+        no more than maxSize x maxSize of them) is compared, so the cost depends on maxSize
+        and not on the image size. Pixels are sampled, not averaged, so sampled differences
+        keep their full delta.
 
-        if (((compareType is COMPARE_TYPE.ALPHA_HI1 or compareType is COMPARE_TYPE.ALPHA_LO1) and self.bytesPerPixel != 4) or
-            ((compareType is COMPARE_TYPE.ALPHA_HI2 or compareType is COMPARE_TYPE.ALPHA_LO2) and other.bytesPerPixel != 4)):
-            return {'isDiff': True, 'debugData': {'msg': 'Invalid image format and comparison type combo',
-                                                  'compareType': str(compareType),
-                                                  'bytesPerPixel1': self.bytesPerPixel, 'bytesPerPixel2': other.bytesPerPixel}}
+        Returns:
+            Same as getDiff when the images can't be compared, otherwise a dictionary with:
+
+                'isDiff':                Whether any sampled pixel was different
+                'deltaImageRgbData':     Delta image for the RGB channels of the sampled pixels
+                'level':                 Each sampled pixel stands for 2^level x 2^level pixels
+                'sampledPixelCount':     How many pixels were compared
+                'approxPixelDiffCount':  Estimate of getDiff's pixelDiffCount, scaled up from
+                                         the sampled pixels that were different
+        """
+        t = self.checkDiffArgs(other, geometry1, geometry2, compareType)
+        if 'isDiff' in t: return t
+        geometry1, geometry2, flagCompareAlpha = t['geometry1'], t['geometry2'], t['flagCompareAlpha']
+
+        level = 0
+        while max(geometry1.width, geometry1.height) > maxSize * 2 ** level:
+            level += 1
+        step = 2 ** level
+
+        # Strided views, only the sampled pixels are read
+        array1 = self.getPixelArray(geometry1)[::step, ::step]
+        array2 = other.getPixelArray(geometry2)[::step, ::step]
+        height, width = array1.shape[:2]
+
+        t = compareArrays(array1, array2, compareType, flagCompareAlpha)
+        if colorLut is None:
+            colorLut = getColorLut(None)
+        deltaImageRgb = bytearray(colorLut[t['rgbDeltaPlane']].tobytes())
+
+        sampledPixelCount = width * height
+        areaPixelCount = geometry1.width * geometry1.height
+        approxPixelDiffCount = round(t['pixelDiffCount'] * areaPixelCount / sampledPixelCount) if sampledPixelCount else 0
+
+        return {'isDiff':               t['pixelDiffCount'] != 0,
+                'deltaImageRgbData':    (deltaImageRgb, width, height),
+                'level':                level,
+                'sampledPixelCount':    sampledPixelCount,
+                'approxPixelDiffCount': approxPixelDiffCount,
+                'geometry1':            geometry1,
+                'geometry2':            geometry2}
+
+    def getDiffNumpy(self, other, geometry1, geometry2, stopOnDiff, compareType, returnFailPixelList, colorDict, flagCompareAlpha,
+                     tileHeight=None, workerCount=1, colorLut=None, progressFunc=None, returnDeltaPlanes=False):
+        """
+        Whole array implementation of getDiff
+        Takes the already validated arguments of getDiff
 
-        flagCompareAlpha = False
-        if compareType is COMPARE_TYPE.FULL:
-            if (self.bytesPerPixel == 4)  != (other.bytesPerPixel == 4): return {'isDiff': True}
-            if (self.bytesPerPixel == 4) and (other.bytesPerPixel == 4): flagCompareAlpha = True
+        The compared area is processed in bands of tileHeight rows (by default bands
+        of about 1M pixels), on workerCount threads. Temporaries are only
+        allocated per band, so they are bounded by the band size.
+        """
+        width = geometry1.width
+        height = geometry1.height
+        if tileHeight is None:
+            tileHeight = getDefaultTileHeight(width)
+
+        # Fast path: rows that are byte for byte equal can't have differences,
+        # so only the rows from the first raw difference onward get compared
+        identicalRowCount = 0
+        if self.bytesPerPixel == other.bytesPerPixel:
+            firstRawDiff = findFirstRawDiff(self.getPixelArray(geometry1), other.getPixelArray(geometry2), tileHeight)
+            if firstRawDiff is None:
+                identicalRowCount = height
+            else:
+                identicalRowCount = firstRawDiff[1]
+                # Unless some bytes are masked or ignored, any raw difference is a pixel difference
+                if stopOnDiff and (compareType is COMPARE_TYPE.FULL or self.bytesPerPixel == 3):
+                    return {'isDiff': True, 'firstDiffPixel': getPixelIndexPair(self, geometry1, other, geometry2, *firstRawDiff)}
+
+        if colorLut is None:
+            colorLut = getColorLut(colorDict)
+        positionDtype = DiffPixelList.getPositionDtype(geometry1)
+
+        deltaImageRgb = bytearray(width * height * 3)
+        deltaImageRgbArray = np.frombuffer(deltaImageRgb, dtype=np.uint8).reshape(height, width, 3)
+        if flagCompareAlpha:
+            deltaImageAlpha = bytearray(width * height * 3)
+            img1Alpha       = bytearray(width * height * 3)
+            img2Alpha       = bytearray(width * height * 3)
+            deltaImageAlphaArray = np.frombuffer(deltaImageAlpha, dtype=np.uint8).reshape(height, width, 3)
+            img1AlphaArray       = np.frombuffer(img1Alpha,       dtype=np.uint8).reshape(height, width, 3)
+            img2AlphaArray       = np.frombuffer(img2Alpha,       dtype=np.uint8).reshape(height, width, 3)
+        if returnDeltaPlanes:
+            rgbDeltaPlaneArray = np.zeros((height, width), dtype=np.uint8)
+            alphaDeltaPlaneArray = np.zeros((height, width), dtype=np.uint8) if flagCompareAlpha else None
+
+        def compareTile(rowStart, rowEnd):
+            tileGeometry1 = Geometry(geometry1.x, geometry1.y + rowStart, width, rowEnd - rowStart)
+            tileGeometry2 = Geometry(geometry2.x, geometry2.y + rowStart, width, rowEnd - rowStart)
+            array1 = self.getPixelArray(tileGeometry1)
+            array2 = other.getPixelArray(tileGeometry2)
+
+            if flagCompareAlpha:
+                img1AlphaArray[rowStart:rowEnd] = array1[:, :, 3:]
+                img2AlphaArray[rowStart:rowEnd] = array2[:, :, 3:]
+
+            if rowEnd <= identicalRowCount:
+                return {'pixelDiffCount': 0, 'absDiffCount': 0, 'maxChannelDelta': 0}
+
+            t = compareArrays(array1, array2, compareType, flagCompareAlpha)
+            rgbDeltaPlane = t.pop('rgbDeltaPlane')
+            alphaDeltaPlane = t.pop('alphaDeltaPlane')
+            if stopOnDiff:
+                if t['pixelDiffCount'] > 0:
+                    diffPlane = rgbDeltaPlane != 0
+                    if flagCompareAlpha:
+                        diffPlane |= alphaDeltaPlane != 0
+                    y, x = divmod(int(np.argmax(diffPlane)), width)
+                    t['firstDiffPixel'] = getPixelIndexPair(self, tileGeometry1, other, tileGeometry2, x, y)
+                return t
+
+            deltaImageRgbArray[rowStart:rowEnd] = colorLut[rgbDeltaPlane]
+            if returnDeltaPlanes:
+                rgbDeltaPlaneArray[rowStart:rowEnd] = rgbDeltaPlane
+                if flagCompareAlpha: alphaDeltaPlaneArray[rowStart:rowEnd] = alphaDeltaPlane
+            if returnFailPixelList:
+                t['diffPixelRgbList'] = getDiffPositionArray(rgbDeltaPlane, rowStart, positionDtype)
+
+            if flagCompareAlpha:
+                deltaImageAlphaArray[rowStart:rowEnd] = colorLut[alphaDeltaPlane]
+                if returnFailPixelList:
+                    t['diffPixelAlphaList'] = getDiffPositionArray(alphaDeltaPlane, rowStart, positionDtype)
+            return t
+
+        maxChannelDelta = 0
+        pixelDiffCount = 0
+        absDiffCount = 0
+        diffPixelRgbList = []
+        diffPixelAlphaList = []
+        tileResultIter = mapRowBands(compareTile, height, tileHeight, workerCount)
+        # mapRowBands yields the results in band order
+        for (rowStart, rowEnd), t in zip(iterRowBands(height, tileHeight), tileResultIter):
+            if stopOnDiff and t['pixelDiffCount'] > 0:
+                tileResultIter.close()
+                return {'isDiff': True, 'firstDiffPixel': t['firstDiffPixel']}
+
+            maxChannelDelta = max(maxChannelDelta, t['maxChannelDelta'])
+            pixelDiffCount += t['pixelDiffCount']
+            absDiffCount += t['absDiffCount']
+            if 'diffPixelRgbList' in t:   diffPixelRgbList.append(t['diffPixelRgbList'])
+            if 'diffPixelAlphaList' in t: diffPixelAlphaList.append(t['diffPixelAlphaList'])
+
+            if progressFunc is not None and not stopOnDiff:
+                progressFunc({'rowsDone':          rowEnd,
+                              'pixelDiffCount':    pixelDiffCount,
+                              'deltaImageRgbData': (deltaImageRgb, width, height)})
+
+        diffPixelRgbList = DiffPixelList(concatenate(diffPixelRgbList, positionDtype), self, geometry1, other, geometry2)
+
+        returnDict = {'isDiff': pixelDiffCount != 0,
+                      'deltaImageRgbData': (deltaImageRgb, width, height),
+                      'maxChannelDelta':   maxChannelDelta,
+                      'pixelDiffCount':    pixelDiffCount,
+                      'absDiffCount':      absDiffCount,
+                      'diffPixelRgbList':  diffPixelRgbList,
+                      'geometry1':         geometry1,
+                      'geometry2':         geometry2}
+
+        if flagCompareAlpha:
+            diffPixelAlphaList = DiffPixelList(concatenate(diffPixelAlphaList, positionDtype), self, geometry1, other, geometry2)
+            alphaDict = {'deltaImageAlphaData': (deltaImageAlpha, width, height),
+                         'img1AlphaData':       (img1Alpha,       width, height),
+                         'img2AlphaData':       (img2Alpha,       width, height),
+                         'diffPixelAlphaList': diffPixelAlphaList}
+
+            returnDict.update(alphaDict)
 
+        if returnDeltaPlanes:
+            returnDict['rgbDeltaPlane'] = rgbDeltaPlaneArray
+            if flagCompareAlpha: returnDict['alphaDeltaPlane'] = alphaDeltaPlaneArray
+
+        return returnDict
+
+    def recolorDiff(self, other, diffData, tolerance=0, colorLut=None, colorDict=None):
+        """
+        Rebuilds the delta images, the pixel lists and the counts of a getDiff result
+        from its delta planes (see returnDeltaPlanes), in one pass over the planes
+        and without comparing the images again
+
+        Args:
+            other: The image self was compared against
+            diffData: The getDiff result, it is not modified
+            tolerance: Deltas up to tolerance are not counted as differences (nor colored)
+            colorLut: Colors for the delta images, as in getDiff (colorDict if None)
+
+        Returns:
+            A copy of diffData with new 'isDiff', 'pixelDiffCount', 'deltaImageRgbData',
+            'deltaImageAlphaData', 'diffPixelRgbList' and 'diffPixelAlphaList' items
+            ('absDiffCount' and 'maxChannelDelta' still cover every delta).
+            diffData as is if it has no delta planes
+        """
+        if 'rgbDeltaPlane' not in diffData: return diffData
+
+        if colorLut is None:
+            colorLut = getColorLut(colorDict)
+        geometry1, geometry2 = diffData['geometry1'], diffData['geometry2']
+        positionDtype = DiffPixelList.getPositionDtype(geometry1)
+        height, width = diffData['rgbDeltaPlane'].shape
+
+        returnDict = dict(diffData)
+        deltaImageRgb, diffPlane = applyTolerance(diffData['rgbDeltaPlane'], tolerance, colorLut)
+        returnDict['deltaImageRgbData'] = (deltaImageRgb, width, height)
+        returnDict['diffPixelRgbList'] = DiffPixelList(getDiffPositionArray(diffPlane, 0, positionDtype), self, geometry1, other, geometry2)
+
+        if 'alphaDeltaPlane' in diffData:
+            deltaImageAlpha, alphaDiffPlane = applyTolerance(diffData['alphaDeltaPlane'], tolerance, colorLut)
+            returnDict['deltaImageAlphaData'] = (deltaImageAlpha, width, height)
+            returnDict['diffPixelAlphaList'] = DiffPixelList(getDiffPositionArray(alphaDiffPlane, 0, positionDtype), self, geometry1, other, geometry2)
+            diffPlane |= alphaDiffPlane
+
+        returnDict['pixelDiffCount'] = int(np.count_nonzero(diffPlane))
+        returnDict['isDiff'] = returnDict['pixelDiffCount'] != 0
+        return returnDict
+
+    def getDiffReference(self, other, geometry1, geometry2, stopOnDiff, compareType, returnFailPixelList, colorDict, flagCompareAlpha):
+        """
+        Pixel by pixel implementation of getDiff
+        Takes the already validated arguments of getDiff
+        """
         deltaImageRgb   = bytearray(b'\x00\x00\x00' * geometry1.width * geometry1.height)
         deltaImageAlpha = bytearray(b'\x00\x00\x00' * geometry1.width * geometry1.height)
         img1Alpha       = bytearray(b'\x00\x00\x00' * geometry1.width * geometry1.height)
@@ -168,10 +547,7 @@ class AbstractImage(object):
                     deltaImageRgb[outputPixelIndex: outputPixelIndex + 3] = color
 
                     if returnFailPixelList:
-                        diffPixelEntry = []
-                        diffPixelEntry.append(inputPixelIndex1)
-                        diffPixelEntry.append(inputPixelIndex2)
-                        diffPixelRgbList.append(diffPixelEntry)
+                        diffPixelRgbList.append(j * geometry1.width + i)
 
                 if absDiffCountPixelAlpha > 0:
                     pixelDiffCountTmp = 1
@@ -183,13 +559,13 @@ class AbstractImage(object):
                     deltaImageAlpha[outputPixelIndex: outputPixelIndex + 3] = color
 
                     if returnFailPixelList:
-                        diffPixelEntry = []
-                        diffPixelEntry.append(inputPixelIndex1)
-                        diffPixelEntry.append(inputPixelIndex2)
-                        diffPixelAlphaList.append(diffPixelEntry)
+                        diffPixelAlphaList.append(j * geometry1.width + i)
 
                 pixelDiffCount += pixelDiffCountTmp
-                if stopOnDiff and pixelDiffCount > 0: return {'isDiff': True}
+                if stopOnDiff and pixelDiffCount > 0: return {'isDiff': True, 'firstDiffPixel': [inputPixelIndex1, inputPixelIndex2]}
+
+        diffPixelRgbList   = DiffPixelList(diffPixelRgbList,   self, geometry1, other, geometry2)
+        diffPixelAlphaList = DiffPixelList(diffPixelAlphaList, self, geometry1, other, geometry2)
 
         returnDict = {'isDiff': pixelDiffCount != 0,
                       'deltaImageRgbData': (deltaImageRgb,   geometry1.width, geometry1.height),
@@ -15,6 +15,7 @@
 
 import re
 import enum
+import mmap
 
 
 @enum.unique
@@ -52,6 +53,31 @@ class COMPARE_TYPE(enum.Enum):
     FULL = 6
 
 
+@enum.unique
+class DIFF_ENGINE(enum.Enum):
+
+    # Pixel by pixel python loop
+    # Slow, kept as the reference implementation the other engines are checked against
+    REFERENCE = 1
+
+    # Whole array numpy operations
+    NUMPY = 2
+
+
+@enum.unique
+class DELTA_COLOR_MAP(enum.Enum):
+
+    # The deltaImageColor colors of the config
+    CONFIG = 1
+
+    # From dark red to yellow to white as the delta grows
+    # (small deltas are boosted so they stay visible)
+    HEAT = 2
+
+    # White for any difference
+    BINARY = 3
+
+
 class Geometry:
     def __init__(self, data=0, y=0, width=0, height=0):
         if isinstance(data, Geometry):
@@ -88,3 +114,21 @@ class Geometry:
     def isAreaEqual(self, other):
         return (self.width  == other.width and
                 self.height == other.height)
+
+
+def mapRawImageFile(filePath, maxHeaderSize=64):
+    """
+    Memory maps a file in PixelView's own format (a one line ascii header
+    followed by the flat pixel data) without reading its body
+
+    Returns:
+        (header, body) where header excludes the line feed and body is a read only
+        memoryview of the mapped pixel data
+    """
+    with open(filePath, 'rb') as f:
+        header = f.readline(maxHeaderSize)
+        if not header.endswith(b'\x0A'):
+            raise Exception('No header found in ' + filePath)
+        # The mapping stays valid after the file is closed
+        mappedFile = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return header[:-1], memoryview(mappedFile)[len(header):]
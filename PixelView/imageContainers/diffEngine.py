@@ -0,0 +1,237 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .common import COMPARE_TYPE, DELTA_COLOR_MAP
+
+
+def absDelta(array1, array2):
+    # max - min keeps everything in uint8, no wider temporaries needed
+    return np.maximum(array1, array2) - np.minimum(array1, array2)
+
+
+def getCompareMask(array1, array2, compareType):
+    """
+    Returns a boolean plane with True for the pixels that take part in the
+    comparison, or None if all of them do
+    """
+    if compareType is COMPARE_TYPE.ALPHA_HI1: return array1[:, :, 3] == 0xFF
+    if compareType is COMPARE_TYPE.ALPHA_LO1: return array1[:, :, 3] != 0x00
+    if compareType is COMPARE_TYPE.ALPHA_HI2: return array2[:, :, 3] == 0xFF
+    if compareType is COMPARE_TYPE.ALPHA_LO2: return array2[:, :, 3] != 0x00
+    return None
+
+
+def compareArrays(array1, array2, compareType, flagCompareAlpha):
+    """
+    Compares two (height, width, bytesPerPixel) arrays of the same height and width
+
+    Returns:
+        A dictionary with:
+            'rgbDeltaPlane':   Max delta of the RGB channels for every pixel
+            'alphaDeltaPlane': Delta of the alpha channel for every pixel (None if alpha is not compared)
+            'pixelDiffCount':  How many pixels were different
+            'absDiffCount':    The sum of the differences per channel of every pixel compared
+            'maxChannelDelta': The max difference found in a channel
+    """
+    rgbDelta = absDelta(array1[:, :, :3], array2[:, :, :3])
+
+    mask = getCompareMask(array1, array2, compareType)
+    if mask is not None:
+        rgbDelta[~mask] = 0
+
+    rgbDeltaPlane = rgbDelta.max(axis=2, initial=0)
+    absDiffCount = int(rgbDelta.sum(dtype=np.uint64))
+    maxChannelDelta = int(rgbDeltaPlane.max(initial=0))
+    diffPlane = rgbDeltaPlane != 0
+
+    alphaDeltaPlane = None
+    if flagCompareAlpha:
+        alphaDeltaPlane = absDelta(array1[:, :, 3], array2[:, :, 3])
+        absDiffCount += int(alphaDeltaPlane.sum(dtype=np.uint64))
+        maxChannelDelta = max(maxChannelDelta, int(alphaDeltaPlane.max(initial=0)))
+        diffPlane |= alphaDeltaPlane != 0
+
+    return {'rgbDeltaPlane':   rgbDeltaPlane,
+            'alphaDeltaPlane': alphaDeltaPlane,
+            'pixelDiffCount':  int(np.count_nonzero(diffPlane)),
+            'absDiffCount':    absDiffCount,
+            'maxChannelDelta': maxChannelDelta}
+
+
+def getArrayStats(array1, array2, compareType, flagCompareAlpha):
+    """
+    Same comparison as compareArrays, but only the statistics are returned
+
+    Returns:
+        A dictionary with:
+            'pixelDiffCount':        How many pixels were different
+            'comparedPixelCount':    How many pixels were not masked out by compareType
+            'channelDeltaHistogram': (channels, 256) array with the count of every delta value per channel
+    """
+    channelCount = 4 if flagCompareAlpha else 3
+    delta = absDelta(array1[:, :, :channelCount], array2[:, :, :channelCount])
+
+    mask = getCompareMask(array1, array2, compareType)
+    if mask is not None:
+        delta = delta[mask]
+    delta = delta.reshape(-1, channelCount)
+
+    channelDeltaHistogram = np.empty((channelCount, 256), dtype=np.int64)
+    for i in range(channelCount):
+        channelDeltaHistogram[i] = np.bincount(delta[:, i], minlength=256)
+
+    return {'pixelDiffCount':        int(np.count_nonzero(delta.any(axis=1))),
+            'comparedPixelCount':    delta.shape[0],
+            'channelDeltaHistogram': channelDeltaHistogram}
+
+
+def getColorLut(colorDict):
+    """
+    Turns a delta image color dictionary into a (256, 3) lookup table
+    indexed by channel delta. Delta 0 (no difference) always maps to black
+    """
+    defaultColor = [0xFF, 0xFF, 0xFF]
+    if colorDict:
+        defaultColor = colorDict.get('default', defaultColor)
+
+    colorLut = np.empty((256, 3), dtype=np.uint8)
+    for t in range(256):
+        color = defaultColor
+        if colorDict:
+            color = colorDict.get(str(t), defaultColor)
+        colorLut[t] = color
+    colorLut[0] = 0
+    return colorLut
+
+
+def getColorMapLut(colorMap, colorDict=None):
+    """
+    Returns the (256, 3) lookup table of a DELTA_COLOR_MAP
+    colorDict is only used by DELTA_COLOR_MAP.CONFIG
+    """
+    if colorMap is DELTA_COLOR_MAP.HEAT:
+        t = np.sqrt(np.arange(256) / 255) * 765
+        colorLut = np.clip(np.stack([t, t - 255, t - 510], axis=1), 0, 255).astype(np.uint8)
+        colorLut[0] = 0
+        return colorLut
+    if colorMap is DELTA_COLOR_MAP.BINARY:
+        return getColorLut({'default': [0xFF, 0xFF, 0xFF]})
+    return getColorLut(colorDict)
+
+
+def applyTolerance(deltaPlane, tolerance, colorLut):
+    """
+    Colors a delta plane, deltas up to tolerance being treated as no difference
+
+    Returns:
+        (deltaImage, diffPlane): the delta image as a bytearray of
+        (height, width, 3) pixels, and the boolean plane of the pixels
+        whose delta is over tolerance
+    """
+    colorLut = colorLut.copy()
+    colorLut[:tolerance + 1] = 0
+
+    height, width = deltaPlane.shape
+    deltaImage = bytearray(width * height * 3)
+    np.take(colorLut, deltaPlane, axis=0, mode='clip', out=np.frombuffer(deltaImage, dtype=np.uint8).reshape(height, width, 3))
+    return deltaImage, deltaPlane > tolerance
+
+
+def getPixelIndexPair(image1, geometry1, image2, geometry2, x, y):
+    """
+    Returns the [pixelIndex1, pixelIndex2] pair (in bytes, within each of the
+    full images) for the x, y coordinates relative to the geometries.
+    x and y can be either ints or arrays of them
+    """
+    pixelIndex1 = ((y + geometry1.y) * image1.width + x + geometry1.x) * image1.bytesPerPixel
+    pixelIndex2 = ((y + geometry2.y) * image2.width + x + geometry2.x) * image2.bytesPerPixel
+    return [pixelIndex1, pixelIndex2]
+
+
+def getDiffPositionArray(deltaPlane, rowOffset=0, dtype=np.int64):
+    """
+    Returns the positions (y * width + x) of the pixels with a non zero delta,
+    in row major order. rowOffset is added to y (for planes that are a band
+    of a larger area)
+    """
+    return (np.flatnonzero(deltaPlane) + rowOffset * deltaPlane.shape[1]).astype(dtype)
+
+
+def concatenate(arrayList, dtype):
+    if not arrayList: return np.empty(0, dtype=dtype)
+    return np.concatenate(arrayList)
+
+
+def getDefaultTileHeight(width):
+    """
+    Height of the bands used when no tileHeight is given: about 1M pixels per band
+    """
+    return max(1, 2 ** 20 // max(width, 1))
+
+
+def findFirstRawDiff(array1, array2, tileHeight=None):
+    """
+    Byte for byte comparison of two arrays with the same shape, done in bands
+    of tileHeight rows (by default bands of about 1M pixels) to keep the temporaries small
+
+    Returns:
+        The (x, y) of the first pixel whose bytes differ, or None if the
+        arrays are identical
+    """
+    if tileHeight is None:
+        tileHeight = getDefaultTileHeight(array1.shape[1])
+    for rowStart, rowEnd in iterRowBands(array1.shape[0], tileHeight):
+        band1 = array1[rowStart:rowEnd]
+        band2 = array2[rowStart:rowEnd]
+        if np.array_equal(band1, band2): continue
+
+        y, x = divmod(int(np.argmax((band1 != band2).any(axis=2))), array1.shape[1])
+        return (x, rowStart + y)
+    return None
+
+
+def iterRowBands(height, tileHeight=None):
+    """
+    Yields the (rowStart, rowEnd) of consecutive bands of tileHeight rows covering height rows
+    If tileHeight is None a single band is yielded
+    """
+    tileHeight = tileHeight or max(height, 1)
+    for rowStart in range(0, height, tileHeight):
+        yield rowStart, min(rowStart + tileHeight, height)
+
+
+def mapRowBands(func, height, tileHeight=None, workerCount=1):
+    """
+    Calls func(rowStart, rowEnd) for every band of iterRowBands and yields the
+    results in band order.
+    With workerCount > 1 the bands run on a thread pool (numpy releases the GIL
+    for the heavy operations). Closing the generator cancels the pending bands.
+    """
+    bandList = list(iterRowBands(height, tileHeight))
+    if workerCount <= 1 or len(bandList) <= 1:
+        for band in bandList:
+            yield func(*band)
+        return
+
+    with ThreadPoolExecutor(max_workers=workerCount) as executor:
+        futureList = [executor.submit(func, *band) for band in bandList]
+        try:
+            for future in futureList:
+                yield future.result()
+        finally:
+            for future in futureList:
+                future.cancel()
@@ -0,0 +1,86 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+
+
+class DiffPixelList:
+    """
+    Compact, read only list of the pixels found different by getDiff
+
+    Only the position of each pixel within the compared area is stored
+    (4 bytes per pixel, 8 for areas of more than 2^32 pixels). The entries,
+    [pixelIndex1, pixelIndex2] pairs (in bytes, within each of the full images),
+    are generated when accessed.
+    """
+
+    def __init__(self, positionArray, image1, geometry1, image2, geometry2):
+        self.positionArray = np.asarray(positionArray).astype(self.getPositionDtype(geometry1), copy=False)
+        self.width = geometry1.width
+        self.x1 = geometry1.x
+        self.y1 = geometry1.y
+        self.x2 = geometry2.x
+        self.y2 = geometry2.y
+        self.imageWidth1 = image1.width
+        self.imageWidth2 = image2.width
+        self.bytesPerPixel1 = image1.bytesPerPixel
+        self.bytesPerPixel2 = image2.bytesPerPixel
+
+    @staticmethod
+    def getPositionDtype(geometry):
+        if geometry.width * geometry.height <= 2 ** 32: return np.uint32
+        return np.int64
+
+    def getPixelIndexArrays(self, positionArray):
+        y, x = np.divmod(positionArray.astype(np.int64), self.width)
+        pixelIndex1 = ((y + self.y1) * self.imageWidth1 + x + self.x1) * self.bytesPerPixel1
+        pixelIndex2 = ((y + self.y2) * self.imageWidth2 + x + self.x2) * self.bytesPerPixel2
+        return pixelIndex1, pixelIndex2
+
+    def getXY(self, index):
+        """
+        Returns the x, y of the entry relative to the compared area
+        """
+        y, x = divmod(int(self.positionArray[index]), self.width)
+        return (x, y)
+
+    def tolist(self):
+        return np.stack(self.getPixelIndexArrays(self.positionArray), axis=1).tolist()
+
+    def __len__(self):
+        return len(self.positionArray)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return np.stack(self.getPixelIndexArrays(self.positionArray[index]), axis=1).tolist()
+
+        x, y = self.getXY(index)
+        return [((y + self.y1) * self.imageWidth1 + x + self.x1) * self.bytesPerPixel1,
+                ((y + self.y2) * self.imageWidth2 + x + self.x2) * self.bytesPerPixel2]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
+
+    def __eq__(self, other):
+        if isinstance(other, DiffPixelList): other = other.tolist()
+        return self.tolist() == other
+
+    def __repr__(self):
+        return 'DiffPixelList(%i entries)' % len(self)
@@ -0,0 +1,33 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from PIL import Image
+from PixelView.imageContainers.abstractImage import AbstractImage
+
+
+class Gray8Image(AbstractImage):
+    """
+    Single channel image (e.g. the alpha channel of another image)
+    It has no file format of its own, but it can be saved as PNG
+    """
+
+    def __init__(self, data=bytearray(), width=0, height=0):
+        super().__init__(data, width, height)
+        self.bytesPerPixel = 1
+        self.mode = 'L'
+
+    def savePNG(self, filePath):
+        img = Image.frombytes('L', (self.width, self.height), self.data)
+        img.save(filePath, 'PNG')
@@ -0,0 +1,145 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import math
+import threading
+import weakref
+import numpy as np
+from collections import OrderedDict
+
+
+def downsample2x(array):
+    """
+    Halves a (height, width, channels) uint8 array with a 2x2 box filter
+    Odd sizes are rounded up, repeating the last row/column
+    """
+    if array.shape[0] % 2 or array.shape[1] % 2:
+        array = np.pad(array, ((0, array.shape[0] % 2), (0, array.shape[1] % 2), (0, 0)), mode='edge')
+
+    t = array[0::2, 0::2].astype(np.uint16)
+    t += array[1::2, 0::2]
+    t += array[0::2, 1::2]
+    t += array[1::2, 1::2]
+    t += 2
+    t >>= 2
+    return t.astype(np.uint8)
+
+
+def getLevelForScale(scale, width, height):
+    """
+    Returns the coarsest mipmap level that still has at least one level pixel per
+    displayed pixel at scale (displayed size / image size)
+    """
+    if scale >= 1: return 0
+    level = int(math.floor(math.log2(1 / scale)))
+    return min(level, getMaxLevel(width, height))
+
+
+def getMaxLevel(width, height):
+    return max(int(math.ceil(math.log2(max(width, height, 1)))), 0)
+
+
+class MipmapCache:
+    """
+    Lazily built mipmap levels of images, shared by all their users
+
+    Level n is a (ceil(height / 2^n), ceil(width / 2^n), bytesPerPixel) array built from
+    level n - 1. Level 0 is the image itself and is not cached. Once the cached levels
+    exceed memoryBudget (in bytes) the least recently used are dropped; the levels of
+    an image are also dropped when the image is garbage collected.
+    """
+
+    def __init__(self, memoryBudget):
+        self.memoryBudget = memoryBudget
+        self.levelDict = OrderedDict()
+        self.cachedSize = 0
+        self.lock = threading.RLock()
+
+    def getLevel(self, img, level):
+        if level <= 0: return img.getPixelArray()
+
+        key = (id(img), level)
+        with self.lock:
+            array = self.levelDict.get(key)
+            if array is not None:
+                self.levelDict.move_to_end(key)
+                return array
+
+        array = downsample2x(self.getLevel(img, level - 1))
+
+        with self.lock:
+            if not any(k[0] == id(img) for k in self.levelDict):
+                weakref.finalize(img, self.dropImage, id(img))
+            if key not in self.levelDict:
+                self.levelDict[key] = array
+                self.cachedSize += array.nbytes
+            self.trim()
+        return array
+
+    def getNearestCachedLevel(self, img, level):
+        """
+        Returns (cachedLevel, array) for the cached level nearest to level
+        (the finer one on a tie), level 0 if none is cached. Nothing is built
+        """
+        if level <= 0: return 0, img.getPixelArray()
+
+        with self.lock:
+            cachedLevelList = [k[1] for k in self.levelDict if k[0] == id(img)]
+            if not cachedLevelList: return 0, img.getPixelArray()
+            cachedLevel = min(cachedLevelList, key=lambda t: (abs(t - level), t))
+            self.levelDict.move_to_end((id(img), cachedLevel))
+            return cachedLevel, self.levelDict[(id(img), cachedLevel)]
+
+    def refreshRows(self, img, rowStart, rowEnd):
+        """
+        Rebuilds the rows of the cached levels of img that cover rows rowStart to
+        rowEnd of level 0, after they changed. Missing levels are not built
+        """
+        level = 1
+        while rowStart < rowEnd:
+            with self.lock:
+                array = self.levelDict.get((id(img), level))
+                if array is None:
+                    # Coarser levels can't be refreshed without this one, they are rebuilt when needed
+                    for key in [k for k in self.levelDict if k[0] == id(img) and k[1] > level]:
+                        self.cachedSize -= self.levelDict.pop(key).nbytes
+                    return
+
+            # Rows of this level whose 2x2 blocks include a changed row
+            rowStart = rowStart // 2
+            rowEnd = min((rowEnd + 1) // 2, array.shape[0])
+            srcArray = self.getLevel(img, level - 1)
+            array[rowStart:rowEnd] = downsample2x(srcArray[rowStart * 2:rowEnd * 2])
+            level += 1
+
+    def dropImage(self, imageId):
+        with self.lock:
+            for key in [k for k in self.levelDict if k[0] == imageId]:
+                self.cachedSize -= self.levelDict.pop(key).nbytes
+
+    def trim(self):
+        with self.lock:
+            while self.cachedSize > self.memoryBudget and self.levelDict:
+                key, array = self.levelDict.popitem(last=False)
+                self.cachedSize -= array.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.levelDict.clear()
+            self.cachedSize = 0
+
+
+# Shared by all the images, see AbstractImage.getMipmapLevel
+mipmapCache = MipmapCache(256 * 2 ** 20)
@@ -17,6 +17,7 @@ import re
 import pUtils
 from PIL import Image
 from PixelView.imageContainers.abstractImage import AbstractImage
+from PixelView.imageContainers.common import mapRawImageFile
 
 
 class Rgb888Image(AbstractImage):
@@ -34,20 +35,34 @@ class Rgb888Image(AbstractImage):
         img = Image.frombytes('RGB', (self.width, self.height), self.data)
         img.save(filePath, "PNG")
 
-    def load(self, filePath, data=None):
-        if data is None:
-            data = pUtils.quickFileRead(filePath, 'rb')
-
-        index = data.find(b'\x0A')
-        header = data[:index]
-        body = data[index + 1:]
-
+    @staticmethod
+    def parseHeader(header):
+        """
+        Returns the (width, height) from the header line (without line feed) of a rgb888 file
+        """
         # Sample string to match: rgb888 320 240
         t = re.match(b'rgb888 ([\x30-\x39]+) ([\x30-\x39]+)', header)
         if t is None:
             raise Exception('Invalid header for a rgb888 file type')
-        self.width = int(t.group(1))
-        self.height = int(t.group(2))
-        self.data = bytearray(body)
+        return int(t.group(1)), int(t.group(2))
+
+    def load(self, filePath, data=None, useMmap=False):
+        """
+        Loads the image from filePath (or from data, the already read file contents)
+        If useMmap is True the file is memory mapped and self.data becomes a read only
+        view of the mapped pixel data, so nothing is read until it is accessed
+        """
+        if useMmap:
+            header, body = mapRawImageFile(filePath)
+        else:
+            if data is None:
+                data = pUtils.quickFileRead(filePath, 'rb')
+
+            index = data.find(b'\x0A')
+            header = data[:index]
+            body = bytearray(memoryview(data)[index + 1:])
+
+        self.width, self.height = self.parseHeader(header)
+        self.data = body
         self.srcFilePath = filePath
         self.srcFileFormat = 'RGB888'
@@ -14,9 +14,14 @@
 
 
 import os
+import itertools
 import pUtils
-from PixelView.utils.image import loadImage
+from PixelView.utils.image import readImageHeader, readPixel, setDecodeCache
+from PixelView.utils.decodeCache import DecodeCache, warmDecodeCache
 from PixelView.utils.cli import pprint, COLOR
+from PixelView.utils.batch import runBatchCompare, runBatchComparePairs, writeReport, getReportFormat, getUnmatchedRowIter
+from PixelView.utils.resultCache import ResultCache
+from PixelView.utils.scan import DirectoryPairing, isDirectoryInput
 from PixelView.gui.mainWindow import launch, MAIN_WINDOW_MODE
 from PixelView.imageContainers.rgb888Image import Rgb888Image
 from PixelView.imageContainers.rgba8888Image import Rgba8888Image
@@ -30,7 +35,7 @@ def version(**kwargs):
 
 def info(filePath, **kwargs):
     try:
-        img = loadImage(filePath)
+        header = readImageHeader(filePath)
     except IOError as e:
         pprint('Error: ', color=COLOR.RED, endLine=False); pprint('[I/O] ({0}): {1}'.format(e.errno, e.strerror))
         exit(1)
@@ -39,16 +44,22 @@ def info(filePath, **kwargs):
         exit(1)
 
     pprint('-----------------------------------')
-    pprint('srcFileName:   ' + os.path.basename(img.srcFilePath))
-    pprint('mode:          ' + img.mode)
-    pprint('size:          ' + str(img.width) + 'x' + str(img.height))
-    pprint('srcFileFormat: ' + img.srcFileFormat)
+    pprint('srcFileName:   ' + os.path.basename(header['srcFilePath']))
+    pprint('mode:          ' + header['mode'])
+    pprint('size:          ' + str(header['width']) + 'x' + str(header['height']))
+    pprint('srcFileFormat: ' + header['srcFileFormat'])
     pprint('-----------------------------------')
 
 
-def printVal(filePath, x, y, **kwargs):
+def initDecodeCache(configManager):
+    if not configManager.getDecodeCacheDir(): return
+    setDecodeCache(DecodeCache(os.path.abspath(configManager.getDecodeCacheDir()), configManager.getDecodeCacheSize() * 2 ** 20))
+
+
+def printVal(filePath, x, y, configManager, **kwargs):
+    initDecodeCache(configManager)
     try:
-        img = loadImage(filePath)
+        pixelData = readPixel(filePath, x, y)
     except IOError as e:
         pprint('Error: ', color=COLOR.RED, endLine=False); pprint('[I/O] ({0}): {1}'.format(e.errno, e.strerror))
         exit(1)
@@ -56,8 +67,7 @@ def printVal(filePath, x, y, **kwargs):
         pprint('Error: ', color=COLOR.RED, endLine=False); pprint('Unsupported image format')
         exit(1)
 
-    start = (img.width * y + x) * img.bytesPerPixel
-    pprint(pUtils.formatHex(img.data[start:start + img.bytesPerPixel]))
+    pprint(pUtils.formatHex(pixelData))
 
 
 def genCanvas(outFilePath, red, green, blue, width, height, alpha, **kwargs):
@@ -102,8 +112,119 @@ def clearConfigStart(configManager, **kwargs):
 
 
 def view(filePathList, configManager, **kwargs):
+    initDecodeCache(configManager)
     launch(configManager, filePathList, mode=MAIN_WINDOW_MODE.VIEW, **kwargs)
 
 
-def compare(filePathList1, filePathList2, fList, configManager, **kwargs):
+def printUnmatched(directoryPairing):
+    for filePath in directoryPairing.unmatchedList1 + directoryPairing.unmatchedList2:
+        pprint('UNMATCHED: ', color=COLOR.RED, endLine=False); pprint(filePath)
+
+
+def checkDirectoryInput(filePathList1, filePathList2):
+    """
+    Returns whether filePathList1 and filePathList2 are directories to pair
+    (exits if only one of them is)
+    """
+    isDir1 = isDirectoryInput(filePathList1)
+    isDir2 = isDirectoryInput(filePathList2)
+    if isDir1 != isDir2:
+        pprint('Error: ', color=COLOR.RED, endLine=False); pprint('Either both or none of the inputs must be directories')
+        exit(2)
+    return isDir1
+
+
+def compare(filePathList1, filePathList2, fList, glob, pairKey, configManager, **kwargs):
+    initDecodeCache(configManager)
+    if checkDirectoryInput(filePathList1, filePathList2):
+        directoryPairing = DirectoryPairing(filePathList1[0], filePathList2[0], pattern=glob, pairKey=pairKey)
+        pairList = sorted(directoryPairing)
+        printUnmatched(directoryPairing)
+        if not pairList:
+            pprint('Error: ', color=COLOR.RED, endLine=False); pprint('No pair of files found')
+            exit(1)
+        filePathList1 = [pair[0] for pair in pairList]
+        filePathList2 = [pair[1] for pair in pairList]
+
     launch(configManager, filePathList1, filePathList2, mode=MAIN_WINDOW_MODE.COMPARE, **kwargs)
+
+
+def compareBatch(filePathList1, filePathList2, geometry1, geometry2, reportFilePath, reportFormat, jobs, unordered, flushInterval,
+                 glob, pairKey, cacheDir, cacheSize, configManager, **kwargs):
+    initDecodeCache(configManager)
+    isDirInput = checkDirectoryInput(filePathList1, filePathList2)
+    if not isDirInput and len(filePathList1) != len(filePathList2):
+        pprint('Error: ', color=COLOR.RED, endLine=False); pprint('filePathList1 and filePathList2 have different lengths')
+        exit(2)
+
+    counterDict = {'equal': 0, 'different': 0, 'error': 0, 'unmatched': 0}
+    resultCacheArgs = (os.path.abspath(cacheDir), cacheSize * 2 ** 20) if cacheDir else None
+
+    def countRows(rowIter):
+        # Rows are written as they come, only the counters are kept
+        for row in rowIter:
+            counterDict[row['status']] += 1
+            if row['status'] != 'equal':
+                pprint('%s: ' % row['status'].upper(), color=COLOR.RED, endLine=False); pprint('%s %s' % (row['filePath1'], row['filePath2']))
+            yield row
+
+    if isDirInput:
+        # Pairs are compared while the directories are being scanned, the unmatched files come last
+        directoryPairing = DirectoryPairing(filePathList1[0], filePathList2[0], pattern=glob, pairKey=pairKey)
+
+        def unmatchedRowIter():
+            # The unmatched files are only known once the scan is over
+            yield from getUnmatchedRowIter(directoryPairing.unmatchedList1, directoryPairing.unmatchedList2)
+
+        rowIter = itertools.chain(runBatchComparePairs(directoryPairing, geometry1, geometry2, workerCount=jobs, isOrdered=not unordered,
+                                                       resultCacheArgs=resultCacheArgs),
+                                  unmatchedRowIter())
+    else:
+        rowIter = runBatchCompare(filePathList1, filePathList2, geometry1, geometry2, workerCount=jobs, isOrdered=not unordered,
+                                  resultCacheArgs=resultCacheArgs)
+    writeReport(countRows(rowIter), reportFilePath, getReportFormat(reportFilePath, reportFormat), flushInterval=flushInterval)
+    if resultCacheArgs:
+        resultCache = ResultCache(*resultCacheArgs)
+        resultCache.trim()
+        resultCache.close()
+
+    pprint('-----------------------------------')
+    pprint('pairs:     ' + str(sum(counterDict.values())))
+    pprint('equal:     ' + str(counterDict['equal']))
+    pprint('different: ' + str(counterDict['different']))
+    pprint('errors:    ' + str(counterDict['error']))
+    if isDirInput: pprint('unmatched: ' + str(counterDict['unmatched']))
+    pprint('report:    ' + os.path.abspath(reportFilePath))
+    pprint('-----------------------------------')
+
+    if counterDict['error'] or counterDict['unmatched']: exit(2)
+    if counterDict['different']: exit(1)
+
+
+def cache(action, filePathList, cacheDir, maxSize, jobs, configManager, **kwargs):
+    cacheDir = cacheDir or configManager.getDecodeCacheDir()
+    if not cacheDir:
+        pprint('Error: ', color=COLOR.RED, endLine=False); pprint('No decode cache directory (set decodeCacheDir in the config or use --cacheDir)')
+        exit(1)
+
+    maxSize = maxSize if maxSize is not None else configManager.getDecodeCacheSize()
+    decodeCache = DecodeCache(os.path.abspath(cacheDir), maxSize * 2 ** 20)
+
+    if action == 'warm':
+        errorCount = 0
+        for filePath, errorMessage in warmDecodeCache(decodeCache, filePathList, workerCount=jobs):
+            if errorMessage is None: continue
+            errorCount += 1
+            pprint('Error: ', color=COLOR.RED, endLine=False); pprint('%s: %s' % (filePath, errorMessage))
+        decodeCache.prune()
+        if errorCount: exit(1)
+    elif action == 'prune':
+        pprint('evicted:   ' + str(decodeCache.prune()))
+
+    cacheInfo = decodeCache.getInfo()
+    pprint('-----------------------------------')
+    pprint('dirPath:   ' + cacheInfo['dirPath'])
+    pprint('entries:   ' + str(cacheInfo['entryCount']))
+    pprint('size:      %.1f MiB' % (cacheInfo['size'] / 2 ** 20))
+    pprint('maxSize:   %.1f MiB' % (cacheInfo['maxSize'] / 2 ** 20))
+    pprint('-----------------------------------')
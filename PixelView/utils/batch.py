@@ -0,0 +1,235 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import csv
+import json
+import math
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PixelView.utils.image import loadImage
+from PixelView.utils.resultCache import ResultCache, getDiffStatsCached
+from PixelView.imageContainers.common import COMPARE_TYPE
+
+
+REPORT_FIELD_LIST = [
+    'index',
+    'filePath1',
+    'filePath2',
+    'status',
+    'pixelDiffCount',
+    'absDiffCount',
+    'maxChannelDelta',
+    'comparedPixelCount',
+    'mse',
+    'psnr',
+    'msg',
+]
+
+
+# One ResultCache per process and cache directory
+RESULT_CACHE_DICT = {}
+
+
+def getResultCache(resultCacheArgs):
+    """
+    Returns the ResultCache of this process for resultCacheArgs, a
+    (dirPath, maxSize) tuple, or None if resultCacheArgs is None
+    """
+    if resultCacheArgs is None: return None
+    if resultCacheArgs not in RESULT_CACHE_DICT:
+        RESULT_CACHE_DICT[resultCacheArgs] = ResultCache(*resultCacheArgs)
+    return RESULT_CACHE_DICT[resultCacheArgs]
+
+
+def loadImageMmap(filePath):
+    return loadImage(filePath, useMmap=True)
+
+
+def comparePair(index, filePath1, filePath2, geometry1=None, geometry2=None, compareType=COMPARE_TYPE.FULL, resultCacheArgs=None):
+    """
+    Loads and compares one image pair (meant to run in a worker process)
+    If resultCacheArgs is provided, the stats go through that ResultCache
+
+    Returns:
+        A report row, a dictionary with the keys of REPORT_FIELD_LIST
+        'status' is one of: 'equal', 'different', 'error' (unable to load or compare)
+        ('unmatched' is used by getUnmatchedRowIter)
+    """
+    row = dict.fromkeys(REPORT_FIELD_LIST)
+    row.update(index=index, filePath1=filePath1, filePath2=filePath2)
+
+    try:
+        stats = getDiffStatsCached(getResultCache(resultCacheArgs), filePath1, filePath2, loadImageMmap,
+                                   geometry1=geometry1, geometry2=geometry2, compareType=compareType)
+    except Exception as e:
+        row.update(status='error', msg=str(e) or type(e).__name__)
+        return row
+
+    if 'debugData' in stats:
+        row.update(status='error', msg=stats['debugData']['msg'])
+        return row
+
+    row.update({key: stats[key] for key in ['pixelDiffCount', 'absDiffCount', 'maxChannelDelta', 'comparedPixelCount', 'mse', 'psnr']})
+    row['status'] = 'different' if stats['isDiff'] else 'equal'
+    return row
+
+
+def comparePairChunk(pairChunk, geometry1, geometry2, compareType, resultCacheArgs):
+    return [comparePair(index, filePath1, filePath2, geometry1, geometry2, compareType, resultCacheArgs) for index, filePath1, filePath2 in pairChunk]
+
+
+def iterChunks(iterable, chunkSize):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunkSize))
+        if not chunk: return
+        yield chunk
+
+
+def runBatchCompare(filePathList1, filePathList2, geometry1=None, geometry2=None, compareType=COMPARE_TYPE.FULL,
+                    workerCount=None, chunkSize=None, isOrdered=True, maxPendingChunks=None, resultCacheArgs=None):
+    """
+    Compares filePathList1[i] against filePathList2[i] for every i,
+    see runBatchComparePairs
+    """
+    if len(filePathList1) != len(filePathList2):
+        raise ValueError('The lists have different lengths (%i and %i)' % (len(filePathList1), len(filePathList2)))
+
+    workerCount = workerCount or os.cpu_count() or 1
+
+    # Chunks amortize the inter process overhead, while keeping several per worker to balance the load
+    chunkSize = chunkSize or max(1, min(64, len(filePathList1) // (workerCount * 4)))
+
+    yield from runBatchComparePairs(zip(filePathList1, filePathList2), geometry1, geometry2, compareType,
+                                    workerCount, chunkSize, isOrdered, maxPendingChunks, resultCacheArgs)
+
+
+def runBatchComparePairs(pairIter, geometry1=None, geometry2=None, compareType=COMPARE_TYPE.FULL,
+                         workerCount=None, chunkSize=16, isOrdered=True, maxPendingChunks=None, resultCacheArgs=None):
+    """
+    Compares every (filePath1, filePath2) pair of pairIter on a pool of
+    workerCount processes (one per core by default)
+
+    Pairs are handed to the workers in chunks of chunkSize, with no more than
+    maxPendingChunks (2 per worker by default) submitted at a time. The pairs
+    are only read from pairIter as the workers need them, and each worker holds
+    the images of a single pair at a time, so memory stays bounded however many
+    pairs there are.
+
+    resultCacheArgs, a (dirPath, maxSize) tuple, makes the workers go through
+    that ResultCache (see utils/resultCache.py).
+
+    Yields:
+        The report rows (see comparePair), in pairIter order if isOrdered,
+        otherwise as soon as they are done
+    """
+    workerCount = workerCount or os.cpu_count() or 1
+    maxPendingChunks = maxPendingChunks or workerCount * 2
+    chunkIter = iterChunks(((i,) + tuple(pair) for i, pair in enumerate(pairIter)), chunkSize)
+
+    if workerCount == 1:
+        for chunk in chunkIter:
+            yield from comparePairChunk(chunk, geometry1, geometry2, compareType, resultCacheArgs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workerCount) as executor:
+        for rowList in mapChunksBounded(executor, comparePairChunk, chunkIter, maxPendingChunks, isOrdered,
+                                        geometry1, geometry2, compareType, resultCacheArgs):
+            yield from rowList
+
+
+def mapChunksBounded(executor, func, chunkIter, maxPendingChunks, isOrdered=True, *args):
+    """
+    Runs func(chunk, *args) on executor for every chunk of chunkIter, with no more
+    than maxPendingChunks submitted at a time. Chunks are only read from chunkIter
+    as the workers need them, so chunkIter can be arbitrarily long
+
+    Yields:
+        The result of every chunk, in chunkIter order if isOrdered, otherwise
+        as soon as they are done
+    """
+    def submitChunks(pendingList):
+        for chunk in itertools.islice(chunkIter, maxPendingChunks - len(pendingList)):
+            pendingList.append(executor.submit(func, chunk, *args))
+
+    pendingList = []
+    submitChunks(pendingList)
+    while pendingList:
+        if isOrdered:
+            doneList = [pendingList.pop(0)]
+        else:
+            doneSet = wait(pendingList, return_when=FIRST_COMPLETED).done
+            doneList = [future for future in pendingList if future in doneSet]
+            pendingList = [future for future in pendingList if future not in doneSet]
+
+        for future in doneList:
+            result = future.result()
+            submitChunks(pendingList)
+            yield result
+
+
+def getUnmatchedRowIter(unmatchedList1, unmatchedList2):
+    """
+    Yields report rows with status 'unmatched' for the files found on a single side
+    """
+    for filePath1 in unmatchedList1:
+        yield dict(dict.fromkeys(REPORT_FIELD_LIST), filePath1=filePath1, status='unmatched', msg='No matching file')
+    for filePath2 in unmatchedList2:
+        yield dict(dict.fromkeys(REPORT_FIELD_LIST), filePath2=filePath2, status='unmatched', msg='No matching file')
+
+
+def getReportFormat(filePath, reportFormat=None):
+    if reportFormat: return reportFormat
+    if filePath and filePath.lower().endswith('.csv'): return 'csv'
+    if filePath and filePath.lower().endswith('.jsonl'): return 'jsonl'
+    return 'json'
+
+
+def writeReport(rowIter, filePath, reportFormat='json', flushInterval=1.0):
+    """
+    Writes the report rows as they come from rowIter, either as:
+        'json':  A JSON list
+        'jsonl': One JSON object per line
+        'csv':   CSV, one line per pair
+    The file is flushed every flushInterval seconds, so it can be followed while the rows come in.
+    psnr is written as null (empty in CSV) for identical images
+    """
+    with open(filePath, 'w', newline='') as f:
+        if reportFormat == 'csv':
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELD_LIST)
+            writer.writeheader()
+        elif reportFormat == 'json':
+            f.write('[')
+
+        lastFlushTime = time.monotonic()
+        for i, row in enumerate(rowIter):
+            if row['psnr'] is not None and math.isinf(row['psnr']):
+                row = dict(row, psnr=None)
+
+            if reportFormat == 'csv':
+                writer.writerow(row)
+            elif reportFormat == 'jsonl':
+                f.write(json.dumps(row) + '\n')
+            else:
+                f.write((',\n' if i else '\n') + json.dumps(row))
+
+            if time.monotonic() - lastFlushTime >= flushInterval:
+                f.flush()
+                lastFlushTime = time.monotonic()
+
+        if reportFormat == 'json':
+            f.write('\n]\n')
@@ -17,6 +17,7 @@ import sys
 import enum
 import pUtils
 import platform
+from PixelView.utils.pathList import PathList
 
 
 def paramList(arg):
@@ -49,10 +50,7 @@ def preprocessFileList(kwargs):
     for fListVarName in fListVarNameList:
         fListVar = kwargs.get(fListVarName)
         if fListVar is None: continue
-        t = []
-        for item in fListVar:
-            t += pUtils.quickFileRead(item, 'txt')
-        kwargs[fListVarName] = t
+        kwargs[fListVarName] = PathList(fListVar, useIndexFile=kwargs.get('fListIndex', False))
 
 
 class COLOR(enum.Enum):
@@ -0,0 +1,147 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from PixelView.utils.image import loadImage, setDecodeCache
+from PixelView.utils.batch import iterChunks, mapChunksBounded
+from PixelView.utils.diskCache import atomicWrite, evictLeastRecentlyUsed, removeFile, StoreCounter
+from PixelView.imageContainers.rgb888Image import Rgb888Image
+from PixelView.imageContainers.rgba8888Image import Rgba8888Image
+
+
+ENTRY_CLASS_DICT = {'.rgb': Rgb888Image, '.rgba': Rgba8888Image}
+
+
+class DecodeCache:
+    """
+    Directory of decoded images (for encoded formats such as PNG), stored in the
+    rgb888/rgba8888 file layout so later loads memory map them instead of decoding.
+
+    Entries are keyed by the absolute path, size and mtime of the source file,
+    so a modified source is decoded again (its stale entry ages out). The mtime of
+    an entry is its last use: once the entries exceed maxSize (in bytes) the least
+    recently used are evicted.
+    """
+
+    def __init__(self, dirPath, maxSize):
+        self.dirPath = dirPath
+        self.maxSize = maxSize
+        self.storeCounter = StoreCounter(32)
+        os.makedirs(dirPath, exist_ok=True)
+
+    def getKey(self, filePath):
+        fileStat = os.stat(filePath)
+        t = '%s|%i|%i' % (os.path.abspath(filePath), fileStat.st_size, fileStat.st_mtime_ns)
+        return hashlib.blake2b(t.encode(), digest_size=20).hexdigest()
+
+    def get(self, filePath, srcFileFormat):
+        """
+        Returns the cached image for filePath (memory mapped), or None on a miss
+        """
+        key = self.getKey(filePath)
+        for extension, imageClass in ENTRY_CLASS_DICT.items():
+            entryPath = os.path.join(self.dirPath, key + extension)
+            if not os.path.exists(entryPath): continue
+
+            img = imageClass()
+            try:
+                img.load(entryPath, useMmap=True)
+                os.utime(entryPath)
+            except Exception:
+                continue
+            img.srcFilePath = filePath
+            img.srcFileFormat = srcFileFormat
+            return img
+        return None
+
+    def put(self, filePath, img):
+        """
+        Stores img, the decoded image of filePath (only RGB and RGBA images can be stored)
+        """
+        extension = {'RGB': '.rgb', 'RGBA': '.rgba'}.get(img.mode)
+        if extension is None: return
+
+        atomicWrite(os.path.join(self.dirPath, self.getKey(filePath) + extension), img.save)
+        if self.storeCounter.count(): self.prune()
+
+    def getEntryList(self):
+        """
+        Returns the [filePath, size, lastUse] of every entry, least recently used first
+        """
+        entryList = []
+        with os.scandir(self.dirPath) as entryIter:
+            for entry in entryIter:
+                if os.path.splitext(entry.name)[1] not in ENTRY_CLASS_DICT: continue
+                try:
+                    entryStat = entry.stat()
+                except OSError:
+                    continue
+                entryList.append([entry.path, entryStat.st_size, entryStat.st_mtime])
+        return sorted(entryList, key=lambda t: t[2])
+
+    def getInfo(self):
+        entryList = self.getEntryList()
+        return {'dirPath': self.dirPath,
+                'entryCount': len(entryList),
+                'size': sum([t[1] for t in entryList]),
+                'maxSize': self.maxSize}
+
+    def prune(self, maxSize=None):
+        """
+        Evicts the least recently used entries until the cache fits in maxSize (self.maxSize by default)
+
+        Returns:
+            How many entries were evicted
+        """
+        maxSize = self.maxSize if maxSize is None else maxSize
+        entryList = [[entryPath, size] for entryPath, size, lastUse in self.getEntryList()]
+        return evictLeastRecentlyUsed(entryList, maxSize, removeFile)
+
+
+def initWarmWorker(dirPath, maxSize):
+    setDecodeCache(DecodeCache(dirPath, maxSize))
+
+
+def warmFile(filePath):
+    """
+    Returns None if filePath could be loaded (and so cached), the error message otherwise
+    """
+    try:
+        loadImage(filePath, useMmap=True)
+    except Exception as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+def warmFileChunk(filePathChunk):
+    return [[filePath, warmFile(filePath)] for filePath in filePathChunk]
+
+
+def warmDecodeCache(decodeCache, filePathList, workerCount=None, chunkSize=16):
+    """
+    Decodes the files of filePathList that are not cached yet, on workerCount processes (one per core by default)
+    The paths are handed to the workers in chunks of chunkSize, read from filePathList as the workers need them
+
+    Yields:
+        (filePath, errorMessage) for every file, errorMessage being None if it was cached
+    """
+    workerCount = workerCount or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workerCount, initializer=initWarmWorker,
+                             initargs=(decodeCache.dirPath, decodeCache.maxSize)) as executor:
+        for resultList in mapChunksBounded(executor, warmFileChunk, iterChunks(filePathList, chunkSize), workerCount * 2):
+            for filePath, errorMessage in resultList:
+                yield filePath, errorMessage
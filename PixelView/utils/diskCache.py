@@ -0,0 +1,83 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import threading
+
+
+def atomicWrite(filePath, writeFunc):
+    """
+    Calls writeFunc(tmpFilePath) to write a temporary file beside filePath, then
+    moves it over filePath, so readers (in any process) see either the old or the
+    new file, never a partial one
+    """
+    tmpFilePath = filePath + '.%i.%i.tmp' % (os.getpid(), threading.get_ident())
+    try:
+        writeFunc(tmpFilePath)
+        os.replace(tmpFilePath, filePath)
+    except BaseException:
+        if os.path.exists(tmpFilePath): os.remove(tmpFilePath)
+        raise
+
+
+def removeFile(filePath):
+    """
+    Returns False if filePath could not be removed (e.g. another process did it first)
+    """
+    try:
+        os.remove(filePath)
+    except OSError:
+        return False
+    return True
+
+
+def evictLeastRecentlyUsed(entryList, maxSize, removeFunc):
+    """
+    Removes entries, least recently used first, until the remaining ones fit in maxSize
+
+    Args:
+        entryList: [key, size] of every entry, least recently used first
+        maxSize: In the same unit as the sizes
+        removeFunc: removeFunc(key) removes an entry, returning False if it couldn't
+
+    Returns:
+        How many entries were removed
+    """
+    excessSize = sum([size for key, size in entryList]) - maxSize
+    evictedCount = 0
+    for key, size in entryList:
+        if excessSize <= 0: break
+        if removeFunc(key) is False: continue
+        excessSize -= size
+        evictedCount += 1
+    return evictedCount
+
+
+class StoreCounter:
+    """
+    Thread safe count of the stores of a size capped cache. count() returns True
+    every interval stores: listing the entries to find the ones to evict costs
+    too much to do it on every store
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.storeCount = 0
+        self.lock = threading.Lock()
+
+    def count(self):
+        with self.lock:
+            self.storeCount += 1
+            return self.storeCount % self.interval == 0
@@ -12,15 +12,131 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import pUtils
+import struct
+import numpy as np
 from PIL import Image
-from io import BytesIO
-from PySide2.QtGui import QImage, QPixmap
+from PixelView.imageContainers.gray8Image import Gray8Image
 from PixelView.imageContainers.rgb888Image import Rgb888Image
 from PixelView.imageContainers.rgba8888Image import Rgba8888Image
 
 
-def loadImage(filePath, nullColor=None):
+# How many bytes from the start of a file the sniff functions get to see
+SNIFF_SIZE = 64
+
+IMAGE_FORMAT_LIST = []
+
+# DecodeCache (see utils/decodeCache.py) of the encoded formats, None if disabled
+DECODE_CACHE = None
+
+
+def setDecodeCache(decodeCache):
+    global DECODE_CACHE
+    DECODE_CACHE = decodeCache
+
+
+def registerImageFormat(name, sniffFunc, loadFunc, headerFunc=None):
+    """
+    Adds an image format to the ones loadImage knows about
+
+    Args:
+        name: Name of the format
+        sniffFunc: sniffFunc(head) returns True if a file starting with the bytes
+                   in head (up to SNIFF_SIZE of them) is of this format
+        loadFunc: loadFunc(filePath, useMmap) returns the loaded image object, or raises
+                  an exception if it can't
+        headerFunc: headerFunc(head) returns a dictionary with the 'width', 'height', 'mode'
+                    and 'bytesPerPixel' of the image, and 'dataOffset' (where the flat pixel
+                    data starts in the file, None if the data is encoded) reading only head.
+                    If None, readImageHeader loads the whole image instead
+    """
+    IMAGE_FORMAT_LIST.append({'name': name, 'sniffFunc': sniffFunc, 'loadFunc': loadFunc, 'headerFunc': headerFunc})
+
+
+def readFileHead(filePath):
+    with open(filePath, 'rb') as f:
+        return f.read(SNIFF_SIZE)
+
+
+def identifyImageFormat(head):
+    """
+    Returns the entry of IMAGE_FORMAT_LIST that matches head (the first bytes of a file)
+    or None if none of them does
+    """
+    for imageFormat in IMAGE_FORMAT_LIST:
+        if imageFormat['sniffFunc'](head): return imageFormat
+    return None
+
+
+def loadRawImage(imageClass):
+    def loadFunc(filePath, useMmap):
+        img = imageClass()
+        img.load(filePath, useMmap=useMmap)
+        return img
+    return loadFunc
+
+
+def readRawImageHeader(imageClass):
+    def headerFunc(head):
+        index = head.find(b'\x0A')
+        if index == -1: raise Exception('No header found')
+
+        img = imageClass()
+        width, height = img.parseHeader(head[:index])
+        return {'width': width, 'height': height, 'mode': img.mode,
+                'bytesPerPixel': img.bytesPerPixel, 'dataOffset': index + 1}
+    return headerFunc
+
+
+def readPNGHeader(head):
+    # The IHDR chunk always comes first, right after the 8 byte signature
+    if head[12:16] != b'IHDR': raise Exception('IHDR chunk not found')
+    width, height, bitDepth, colorType = struct.unpack('>IIBB', head[16:26])
+
+    # Same modes loadPNG accepts (truecolor, with or without alpha)
+    if colorType == 2:
+        mode, bytesPerPixel = 'RGB', 3
+    elif colorType == 6:
+        mode, bytesPerPixel = 'RGBA', 4
+    else:
+        raise Exception('Unknown Image mode')
+    return {'width': width, 'height': height, 'mode': mode,
+            'bytesPerPixel': bytesPerPixel, 'dataOffset': None}
+
+
+def loadPNG(filePath, useMmap):
+    if DECODE_CACHE is not None:
+        t = DECODE_CACHE.get(filePath, 'PNG')
+        if t is not None: return t
+
+    img = Image.open(filePath)
+    if img.format != 'PNG': raise Exception('Unsupported image format ' + img.format)
+
+    width, height = img.size
+    data = bytearray(img.tobytes())
+    if img.mode == 'RGBA':
+        t = Rgba8888Image(data, width, height)
+    elif img.mode == 'RGB':
+        t = Rgb888Image(data, width, height)
+    else:
+        raise Exception('Unknown Image mode')
+    t.srcFilePath = filePath
+    t.srcFileFormat = 'PNG'
+
+    if DECODE_CACHE is not None:
+        # The image is already decoded, a full disk must not make the load fail
+        try:
+            DECODE_CACHE.put(filePath, t)
+        except Exception:
+            pass
+    return t
+
+
+registerImageFormat('RGBA8888', lambda head: head.startswith(b'rgba8888 '),          loadRawImage(Rgba8888Image), readRawImageHeader(Rgba8888Image))
+registerImageFormat('RGB888',   lambda head: head.startswith(b'rgb888 '),            loadRawImage(Rgb888Image),   readRawImageHeader(Rgb888Image))
+registerImageFormat('PNG',      lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'), loadPNG,                      readPNGHeader)
+
+
+def loadImage(filePath, nullColor=None, useMmap=False):
 
     def genPlaceHolder():
         # If we couldn't load  an image we generate a placeholder
@@ -38,64 +154,64 @@ def loadImage(filePath, nullColor=None):
         return t
 
     try:
-        data = pUtils.quickFileRead(filePath, 'rb')
+        imageFormat = identifyImageFormat(readFileHead(filePath))
+        if imageFormat is None: raise Exception('Unable to identify image format')
+        return imageFormat['loadFunc'](filePath, useMmap)
     except Exception:
         if nullColor: return genPlaceHolder()
         raise
 
-    try:
-        img = Rgba8888Image()
-        img.load(filePath, data=data)
-        return img
-    except Exception: pass
 
-    try:
-        img = Rgb888Image()
-        img.load(filePath, data=data)
-        return img
-    except Exception: pass
+def readImageHeader(filePath):
+    """
+    Returns the basic information of an image file, reading as little of it as possible
 
-    try:
-        img = Image.open(BytesIO(data))
-    except Exception:
-        raise Exception('Unable to identify image format')
+    Returns:
+        A dictionary with 'srcFilePath', 'srcFileFormat', 'width', 'height', 'mode',
+        'bytesPerPixel' and 'dataOffset' (where the flat pixel data starts in the file,
+        None if the format encodes it)
+    """
+    head = readFileHead(filePath)
+    imageFormat = identifyImageFormat(head)
+    if imageFormat is None: raise Exception('Unable to identify image format')
 
-    try:
-        if img.format != 'PNG': raise Exception('Unsupported image format ' + img.format)
-
-        width, height = img.size
-        data = bytearray(img.tobytes())
-        if img.mode == 'RGBA':
-            t = Rgba8888Image(data, width, height)
-        elif img.mode == 'RGB':
-            t = Rgb888Image(data, width, height)
-        else:
-            raise Exception('Unknown Image mode')
-        t.srcFilePath = filePath
-        t.srcFileFormat = 'PNG'
-        return t
-    except Exception:
-        if nullColor: return genPlaceHolder()
-        raise
+    if imageFormat['headerFunc'] is None:
+        img = imageFormat['loadFunc'](filePath, True)
+        t = {'width': img.width, 'height': img.height, 'mode': img.mode,
+             'bytesPerPixel': img.bytesPerPixel, 'dataOffset': None}
+    else:
+        t = imageFormat['headerFunc'](head)
 
+    t['srcFilePath'] = filePath
+    t['srcFileFormat'] = imageFormat['name']
+    return t
 
-def dropAlpha(img):
-    if isinstance(img, Rgb888Image):
-        return img
 
-    if isinstance(img, Rgba8888Image):
-        data = img.data
-        red   = data[0::4]
-        green = data[1::4]
-        blue  = data[2::4]
+def readPixel(filePath, x, y):
+    """
+    Returns the bytes of the pixel at x, y
+    For formats with flat pixel data only those bytes are read from the file
+    """
+    t = readImageHeader(filePath)
+    start = (t['width'] * y + x) * t['bytesPerPixel']
 
-        newData = bytearray([0, 0, 0] * int(len(data) / 4))
-        newData[0::3] = red
-        newData[1::3] = green
-        newData[2::3] = blue
-        return Rgb888Image(newData, img.width, img.height)
+    if t['dataOffset'] is None:
+        img = loadImage(filePath, useMmap=True)
+        return bytes(img.data[start:start + img.bytesPerPixel])
 
-    raise Exception('Invalid input parameter type')
+    with open(filePath, 'rb') as f:
+        f.seek(t['dataOffset'] + start)
+        return f.read(t['bytesPerPixel'])
+
+
+def extractChannels(img, channelSlice):
+    """
+    Returns a new bytearray with only the channels in channelSlice of every pixel of img
+    """
+    array = img.getPixelArray()[:, :, channelSlice]
+    newData = bytearray(array.size)
+    np.frombuffer(newData, dtype=np.uint8).reshape(array.shape)[:] = array
+    return newData
 
 
 def getAlphaImage(img):
@@ -103,22 +219,7 @@ def getAlphaImage(img):
         return None
 
     if isinstance(img, Rgba8888Image):
-        data = img.data
-        alpha = data[3::4]
-
-        newData = bytearray([alpha[i // 3] for i in range(len(alpha) * 3)])
-        return Rgb888Image(newData, img.width, img.height)
+        return Gray8Image(extractChannels(img, slice(3, 4)), img.width, img.height)
 
     raise Exception('Invalid input parameter type')
 
-
-def widgetDisplayImage(widget, img):
-    imgFormat = QImage.Format_RGB888
-
-    img = dropAlpha(img)
-    displayImage = QImage(img.data,
-                          img.width, img.height,
-                          imgFormat)
-
-    displayImagePix = QPixmap.fromImage((displayImage))
-    widget.setPixmap(displayImagePix)
@@ -0,0 +1,133 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import mmap
+import numpy as np
+from PixelView.utils.diskCache import atomicWrite
+
+
+def getIndexFilePath(filePath):
+    return filePath + '.idx.npz'
+
+
+def buildLineIndex(data):
+    """
+    Returns the (startArray, lengthArray) of the non empty lines of data
+    (a uint8 array). Line ends can be either LF or CRLF
+    """
+    newlineArray = np.flatnonzero(data == 0x0A)
+    startArray = np.concatenate(([0], newlineArray + 1)).astype(np.int64)
+    endArray = np.concatenate((newlineArray, [len(data)])).astype(np.int64)
+
+    hasCR = (endArray > startArray) & (data[np.maximum(endArray - 1, 0)] == 0x0D) if len(data) else endArray > startArray
+    endArray -= hasCR
+
+    keep = endArray > startArray
+    return startArray[keep], (endArray - startArray)[keep].astype(np.uint32)
+
+
+def loadLineIndex(filePath, indexFilePath):
+    """
+    Returns the (startArray, lengthArray) saved at indexFilePath, or None if
+    it is missing, unreadable or was saved for another version of filePath
+    """
+    try:
+        fileStat = os.stat(filePath)
+        with np.load(indexFilePath) as t:
+            if int(t['fileSize']) != fileStat.st_size or int(t['mtimeNs']) != fileStat.st_mtime_ns: return None
+            return t['startArray'], t['lengthArray']
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def saveLineIndex(filePath, indexFilePath, startArray, lengthArray):
+    # Without an index the list is just scanned again, a read only directory is fine
+    try:
+        fileStat = os.stat(filePath)
+
+        def writeIndexFile(tmpFilePath):
+            with open(tmpFilePath, 'wb') as f:
+                np.savez(f, startArray=startArray, lengthArray=lengthArray,
+                         fileSize=fileStat.st_size, mtimeNs=fileStat.st_mtime_ns)
+        atomicWrite(indexFilePath, writeIndexFile)
+    except OSError:
+        pass
+
+
+class PathList:
+    """
+    List of the paths found in one or more list files (one path per line,
+    empty lines are skipped)
+
+    The files are memory mapped and only a line index is kept in memory
+    (14 bytes per path), paths are decoded when accessed. The index is built
+    with whole-array operations and, if useIndexFile, saved beside each list
+    file and reused while the list file does not change.
+
+    Supports len, indexing, iteration and pop (as used by MainWindow.dropImage).
+    """
+
+    def __init__(self, filePathList, useIndexFile=False):
+        if isinstance(filePathList, str): filePathList = [filePathList]
+
+        self.mmapList = []
+        fileIndexArrayList = []
+        startArrayList = []
+        lengthArrayList = []
+        for filePath in filePathList:
+            with open(filePath, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0: continue
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            t = loadLineIndex(filePath, getIndexFilePath(filePath)) if useIndexFile else None
+            if t is None:
+                t = buildLineIndex(np.frombuffer(mm, dtype=np.uint8))
+                if useIndexFile: saveLineIndex(filePath, getIndexFilePath(filePath), *t)
+            startArray, lengthArray = t
+
+            fileIndexArrayList.append(np.full(len(startArray), len(self.mmapList), dtype=np.uint16))
+            startArrayList.append(startArray)
+            lengthArrayList.append(lengthArray)
+            self.mmapList.append(mm)
+
+        self.fileIndexArray = np.concatenate(fileIndexArrayList) if fileIndexArrayList else np.empty(0, dtype=np.uint16)
+        self.startArray = np.concatenate(startArrayList) if startArrayList else np.empty(0, dtype=np.int64)
+        self.lengthArray = np.concatenate(lengthArrayList) if lengthArrayList else np.empty(0, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.startArray)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        mm = self.mmapList[self.fileIndexArray[index]]
+        start = int(self.startArray[index])
+        return mm[start: start + int(self.lengthArray[index])].decode()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def pop(self, index=-1):
+        item = self[index]
+        self.fileIndexArray = np.delete(self.fileIndexArray, index)
+        self.startArray = np.delete(self.startArray, index)
+        self.lengthArray = np.delete(self.lengthArray, index)
+        return item
+
+    def __repr__(self):
+        return 'PathList(%i paths)' % len(self)
@@ -0,0 +1,164 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import mmap
+import threading
+import numpy as np
+from collections import OrderedDict
+from PixelView.imageContainers.abstractImage import AbstractImage
+from PixelView.imageContainers.diffPixelList import DiffPixelList
+from PixelView.utils.threading import PRIORITY
+
+
+def isMappedBuffer(data):
+    """
+    Returns True if data is a view of a memory mapped file (its pages belong to
+    the page cache, not to the process)
+    """
+    while isinstance(data, (memoryview, np.ndarray)):
+        data = data.obj if isinstance(data, memoryview) else data.base
+    return isinstance(data, mmap.mmap)
+
+
+def getDataSize(data):
+    """
+    Rough estimate (in bytes) of the memory held by the images, arrays and
+    pixel lists found in data (dicts and lists are walked recursively)
+    Memory mapped buffers are not counted
+    """
+    if isinstance(data, AbstractImage): return getDataSize(data.data)
+    if isinstance(data, DiffPixelList): return data.positionArray.nbytes
+    if isinstance(data, (np.ndarray, memoryview)) and isMappedBuffer(data): return 0
+    if isinstance(data, np.ndarray): return data.nbytes
+    if isinstance(data, memoryview): return data.nbytes
+    if isinstance(data, (bytes, bytearray)): return len(data)
+    if isinstance(data, dict): return sum([getDataSize(value) for value in data.values()])
+    if isinstance(data, (list, tuple)): return sum([getDataSize(value) for value in data])
+    return 0
+
+
+class PrefetchCache:
+    """
+    Cache of futures holding the loaded data of image sets, keyed by any hashable
+    (typically the image paths).
+
+    get() is meant for the entry on screen: it runs at high priority on workerPool
+    and starts a new generation, cancelling the requests made before it that did
+    not start yet. prefetch() queues the neighbouring entries at low priority,
+    nearest first, as long as they are expected to fit in memoryBudget (in bytes).
+    Entries are evicted least recently used first once the finished ones exceed
+    memoryBudget, the ones out of the prefetch window before the ones in it.
+    """
+
+    def __init__(self, memoryBudget, workerPool):
+        self.memoryBudget = memoryBudget
+        self.workerPool = workerPool
+        self.futureDict = OrderedDict()
+        self.lock = threading.Lock()
+        # Size of the last finished entry measured, the estimate for the ones not done yet
+        self.entrySizeEstimate = 0
+
+    def getSizeDict(self):
+        """
+        Returns the size of every finished entry, in futureDict order
+        """
+        sizeDict = {}
+        for key, future in self.futureDict.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                sizeDict[key] = getDataSize(future.result())
+                self.entrySizeEstimate = sizeDict[key]
+        return sizeDict
+
+    def isPending(self, key):
+        future = self.futureDict.get(key)
+        return future is not None and not future.cancelled()
+
+    def get(self, key, loadFunc):
+        """
+        Returns the future for key, submitting loadFunc() if it is not cached yet
+        (or if its prefetch has not started, so it does not wait in the queue)
+        """
+        with self.lock:
+            generation = self.workerPool.newGeneration()
+            future = self.futureDict.get(key)
+            if future is None or future.cancel():
+                future = self.workerPool.submit(loadFunc, priority=PRIORITY.HIGH, generation=generation)
+                self.futureDict[key] = future
+            self.futureDict.move_to_end(key)
+            return future
+
+    def prefetch(self, keyFuncList, protectedKeyList=()):
+        """
+        Args:
+            keyFuncList: [key, loadFunc] pairs to prefetch, nearest first
+            protectedKeyList: Keys that must stay cached besides those of keyFuncList (the entry on screen)
+
+        Pending prefetches not requested anymore are cancelled. The entries of keyFuncList
+        are only submitted while the protected entries, plus the ones nearer than them,
+        are expected to fit in the memory budget. The ones past it are dropped, so they
+        are not computed only to be evicted.
+        """
+        wantedKeySet = set([key for key, loadFunc in keyFuncList]) | set(protectedKeyList)
+        with self.lock:
+            for key in list(self.futureDict.keys()):
+                if key not in wantedKeySet and self.futureDict[key].cancel():
+                    del self.futureDict[key]
+
+            sizeDict = self.getSizeDict()
+            usedSize = sum([sizeDict.get(key, self.entrySizeEstimate) for key in protectedKeyList])
+            fitCount = 0
+            for key, loadFunc in keyFuncList:
+                usedSize += sizeDict.get(key, self.entrySizeEstimate)
+                if usedSize > self.memoryBudget: break
+                if not self.isPending(key):
+                    self.futureDict[key] = self.workerPool.submit(loadFunc, priority=PRIORITY.LOW)
+                fitCount += 1
+
+            for key, loadFunc in keyFuncList[fitCount:]:
+                future = self.futureDict.get(key)
+                if future is not None and (future.done() or future.cancel()):
+                    del self.futureDict[key]
+
+            # Entries out of the window become the least recently used, then the farthest ones
+            for key, loadFunc in reversed(keyFuncList):
+                if key in self.futureDict: self.futureDict.move_to_end(key)
+            for key in protectedKeyList:
+                if key in self.futureDict: self.futureDict.move_to_end(key)
+
+        self.trim(protectedKeyList)
+
+    def trim(self, protectedKeyList=()):
+        """
+        Evicts finished entries, least recently used first, until the cache fits in the memory budget
+        """
+        with self.lock:
+            sizeDict = self.getSizeDict()
+            totalSize = sum(sizeDict.values())
+            for key in list(sizeDict.keys()):
+                if totalSize <= self.memoryBudget: break
+                if key in protectedKeyList: continue
+                del self.futureDict[key]
+                totalSize -= sizeDict[key]
+
+    def invalidate(self, key):
+        with self.lock:
+            future = self.futureDict.pop(key, None)
+            if future is not None: future.cancel()
+
+    def clear(self):
+        with self.lock:
+            for future in self.futureDict.values():
+                future.cancel()
+            self.futureDict.clear()
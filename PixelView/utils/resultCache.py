@@ -0,0 +1,290 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import io
+import json
+import time
+import sqlite3
+import threading
+import hashlib
+import numpy as np
+from PixelView.imageContainers.common import Geometry, COMPARE_TYPE
+from PixelView.imageContainers.diffPixelList import DiffPixelList
+from PixelView.utils.diskCache import atomicWrite, evictLeastRecentlyUsed, StoreCounter
+
+
+def hashFile(filePath, blockSize=2 ** 20):
+    h = hashlib.blake2b(digest_size=20)
+    with open(filePath, 'rb') as f:
+        for block in iter(lambda: f.read(blockSize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def toJsonParam(value):
+    if isinstance(value, Geometry): return [value.x, value.y, value.width, value.height]
+    if isinstance(value, COMPARE_TYPE): return value.name
+    if isinstance(value, np.ndarray): return hashlib.blake2b(np.ascontiguousarray(value).tobytes(), digest_size=20).hexdigest()
+    return value
+
+
+def isImageData(value):
+    return isinstance(value, (tuple, list)) and len(value) == 3 and isinstance(value[0], (bytes, bytearray, memoryview))
+
+
+class ResultCache:
+    """
+    Persistent cache of comparison results, content addressed: results are keyed
+    by the digests of both files plus the comparison parameters, so renaming or
+    touching a file does not invalidate them.
+
+    The digest of a file is only recomputed when its (size, mtime, inode) change.
+    Entries hold the JSON-able part of the result in an sqlite index and, if
+    stored, the arrays (delta images, pixel lists) in a compressed .npz file
+    beside it. Once the entries exceed maxSize (in bytes) the least recently
+    used are evicted, and so are the file digests beyond maxDigestCount.
+    Several processes can share the same cache directory.
+    """
+
+    def __init__(self, dirPath, maxSize, maxDigestCount=2 ** 16):
+        self.dirPath = dirPath
+        self.maxSize = maxSize
+        self.maxDigestCount = maxDigestCount
+        self.storeCounter = StoreCounter(64)
+        self.lock = threading.RLock()
+        os.makedirs(os.path.join(dirPath, 'arrays'), exist_ok=True)
+
+        # Shared by the loading threads, self.lock serializes the accesses
+        self.db = sqlite3.connect(os.path.join(dirPath, 'index.sqlite'), timeout=60, check_same_thread=False)
+        # Indexes from older versions have no lastAccess in fileDigest, the digests are just recomputed
+        if 'lastAccess' not in [row[1] for row in self.db.execute('PRAGMA table_info(fileDigest)')]:
+            self.db.execute('DROP TABLE IF EXISTS fileDigest')
+        self.db.execute('CREATE TABLE IF NOT EXISTS fileDigest (filePath TEXT PRIMARY KEY, size INTEGER, mtimeNs INTEGER, inode INTEGER, digest TEXT, lastAccess REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS fileDigestLastAccess ON fileDigest (lastAccess)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS result (key TEXT PRIMARY KEY, data TEXT, hasArrays INTEGER, size INTEGER, lastAccess REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS resultLastAccess ON result (lastAccess)')
+        self.db.commit()
+
+    def getFileDigest(self, filePath):
+        filePath = os.path.abspath(filePath)
+        fileStat = os.stat(filePath)
+        with self.lock:
+            row = self.db.execute('SELECT size, mtimeNs, inode, digest FROM fileDigest WHERE filePath = ?', (filePath,)).fetchone()
+            if row is not None and row[:3] == (fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino):
+                self.db.execute('UPDATE fileDigest SET lastAccess = ? WHERE filePath = ?', (time.time(), filePath))
+                self.db.commit()
+                return row[3]
+
+        digest = hashFile(filePath)
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO fileDigest VALUES (?, ?, ?, ?, ?, ?)',
+                            (filePath, fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino, digest, time.time()))
+            self.db.commit()
+        return digest
+
+    def getKey(self, filePath1, filePath2, **paramDict):
+        """
+        Returns the cache key for comparing the current content of filePath1 and
+        filePath2 with the parameters of paramDict (e.g. the getDiff arguments)
+        """
+        t = [self.getFileDigest(filePath1), self.getFileDigest(filePath2),
+             sorted([key, toJsonParam(value)] for key, value in paramDict.items())]
+        return hashlib.blake2b(json.dumps(t).encode(), digest_size=20).hexdigest()
+
+    def getArrayFilePath(self, key):
+        return os.path.join(self.dirPath, 'arrays', key + '.npz')
+
+    def load(self, key, needArrays=False):
+        """
+        Returns:
+            (data, arrayDict), arrayDict being None if the arrays were not stored.
+            None on a miss (or if needArrays and the arrays were not stored)
+        """
+        with self.lock:
+            row = self.db.execute('SELECT data, hasArrays FROM result WHERE key = ?', (key,)).fetchone()
+            if row is None or (needArrays and not row[1]): return None
+
+            arrayDict = None
+            if row[1]:
+                try:
+                    with np.load(self.getArrayFilePath(key)) as t:
+                        arrayDict = {name: t[name] for name in t.files}
+                except (OSError, ValueError):
+                    self.remove(key)
+                    return None
+
+            self.db.execute('UPDATE result SET lastAccess = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+            return json.loads(row[0]), arrayDict
+
+    def store(self, key, data, arrayDict=None):
+        size = len(json.dumps(data))
+        hasArrays = arrayDict is not None
+        if hasArrays:
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, **arrayDict)
+
+            def writeArrayFile(tmpFilePath):
+                with open(tmpFilePath, 'wb') as f:
+                    f.write(buffer.getbuffer())
+            atomicWrite(self.getArrayFilePath(key), writeArrayFile)
+            size += buffer.getbuffer().nbytes
+
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO result VALUES (?, ?, ?, ?, ?)', (key, json.dumps(data), int(hasArrays), size, time.time()))
+            self.db.commit()
+        if self.storeCounter.count(): self.trim()
+
+    def remove(self, key):
+        with self.lock:
+            self.db.execute('DELETE FROM result WHERE key = ?', (key,))
+            self.db.commit()
+            if os.path.exists(self.getArrayFilePath(key)): os.remove(self.getArrayFilePath(key))
+
+    def getSize(self):
+        return self.db.execute('SELECT COALESCE(SUM(size), 0) FROM result').fetchone()[0]
+
+    def trim(self):
+        """
+        Evicts the least recently used entries until the cache fits in maxSize,
+        and the least recently used file digests beyond maxDigestCount
+        """
+        with self.lock:
+            if self.getSize() > self.maxSize:
+                evictLeastRecentlyUsed(self.db.execute('SELECT key, size FROM result ORDER BY lastAccess').fetchall(), self.maxSize, self.remove)
+
+            excessCount = self.db.execute('SELECT COUNT(*) FROM fileDigest').fetchone()[0] - self.maxDigestCount
+            if excessCount > 0:
+                self.db.execute('DELETE FROM fileDigest WHERE filePath IN (SELECT filePath FROM fileDigest ORDER BY lastAccess LIMIT ?)', (excessCount,))
+                self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def serializeDiffResult(data, storeArrays):
+    """
+    Splits a getDiff result into its JSON-able part and its arrays (or drops
+    the arrays if not storeArrays)
+    """
+    jsonData = {}
+    arrayDict = {} if storeArrays else None
+    for key, value in data.items():
+        if isinstance(value, Geometry):
+            jsonData[key] = {'geometry': toJsonParam(value)}
+        elif isImageData(value):
+            if storeArrays:
+                arrayDict[key] = np.frombuffer(value[0], dtype=np.uint8)
+                jsonData[key] = {'imageData': [value[1], value[2]]}
+        elif isinstance(value, DiffPixelList):
+            if storeArrays:
+                arrayDict[key] = value.positionArray
+                jsonData[key] = {'diffPixelList': True}
+        elif isinstance(value, np.ndarray):
+            if storeArrays:
+                arrayDict[key] = value
+                jsonData[key] = {'array': True}
+        else:
+            jsonData[key] = value
+    return jsonData, arrayDict
+
+
+def deserializeDiffResult(jsonData, arrayDict, img1, img2):
+    data = {}
+    for key, value in jsonData.items():
+        if isinstance(value, dict) and 'geometry' in value:
+            data[key] = Geometry(*value['geometry'])
+        elif isinstance(value, dict) and 'imageData' in value:
+            data[key] = (bytearray(arrayDict[key]),) + tuple(value['imageData'])
+        elif isinstance(value, dict) and 'array' in value:
+            data[key] = arrayDict[key]
+        else:
+            data[key] = value
+
+    for key, value in jsonData.items():
+        if isinstance(value, dict) and 'diffPixelList' in value:
+            data[key] = DiffPixelList(arrayDict[key], img1, data['geometry1'], img2, data['geometry2'])
+    return data
+
+
+def getDiffCacheKey(resultCache, img1, img2, **kwargs):
+    """
+    Returns the resultCache key of img1.getDiff(img2, **kwargs), None if it is not
+    cached (no resultCache, or images without source file, e.g. null images)
+    """
+    if resultCache is None or not img1.srcFilePath or not img2.srcFilePath: return None
+
+    # Arguments that do not change the result are not part of the key
+    paramDict = {key: value for key, value in kwargs.items() if key not in ['engine', 'tileHeight', 'workerCount', 'colorDict', 'colorLut', 'progressFunc']}
+    paramDict['colorLut'] = kwargs.get('colorLut')
+    if paramDict['colorLut'] is None:
+        paramDict['colorDict'] = kwargs.get('colorDict')
+    return resultCache.getKey(img1.srcFilePath, img2.srcFilePath, method='getDiff', **paramDict)
+
+
+def loadDiffCached(resultCache, key, img1, img2, storeArrays=True):
+    """
+    Returns the getDiff result cached under key (see getDiffCacheKey), or None on a miss
+    """
+    if key is None: return None
+
+    t = resultCache.load(key, needArrays=storeArrays)
+    if t is None: return None
+    return deserializeDiffResult(t[0], t[1], img1, img2)
+
+
+def storeDiffCached(resultCache, key, data, storeArrays=True):
+    """
+    Caches the getDiff result data under key (see getDiffCacheKey)
+    """
+    if key is not None and 'debugData' not in data:
+        resultCache.store(key, *serializeDiffResult(data, storeArrays))
+
+
+def getDiffCached(resultCache, img1, img2, storeArrays=True, **kwargs):
+    """
+    img1.getDiff(img2, **kwargs) going through resultCache
+    (images without source file, e.g. null images, are not cached)
+
+    If not storeArrays, only the stats of the result are cached, and a hit
+    returns a result without delta images nor pixel lists
+    """
+    key = getDiffCacheKey(resultCache, img1, img2, **kwargs)
+    data = loadDiffCached(resultCache, key, img1, img2, storeArrays)
+    if data is None:
+        data = img1.getDiff(img2, **kwargs)
+        storeDiffCached(resultCache, key, data, storeArrays)
+    return data
+
+
+def getDiffStatsCached(resultCache, filePath1, filePath2, loadFunc, **kwargs):
+    """
+    loadFunc(filePath1).getDiffStats(loadFunc(filePath2), **kwargs) going through resultCache
+    On a hit the images are not even loaded
+    """
+    if resultCache is None:
+        return loadFunc(filePath1).getDiffStats(loadFunc(filePath2), **kwargs)
+
+    paramDict = {key: value for key, value in kwargs.items() if key not in ['tileHeight', 'workerCount']}
+    key = resultCache.getKey(filePath1, filePath2, method='getDiffStats', **paramDict)
+
+    t = resultCache.load(key)
+    if t is not None: return deserializeDiffResult(t[0], None, None, None)
+
+    data = loadFunc(filePath1).getDiffStats(loadFunc(filePath2), **kwargs)
+    if 'debugData' not in data:
+        resultCache.store(key, *serializeDiffResult(data, False))
+    return data
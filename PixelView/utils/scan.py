@@ -0,0 +1,126 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import re
+import fnmatch
+
+
+def scanDirectory(dirPath, pattern=None):
+    """
+    Yields the path (relative to dirPath) of every file under dirPath, as the
+    directories are read. If pattern is provided only the relative paths
+    matching it (fnmatch style, e.g. '*.png') are yielded.
+    Symbolic links to directories are not followed.
+    """
+    dirStack = ['']
+    while dirStack:
+        relDirPath = dirStack.pop()
+        with os.scandir(os.path.join(dirPath, relDirPath)) as entryIter:
+            for entry in entryIter:
+                relPath = os.path.join(relDirPath, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    dirStack.append(relPath)
+                elif pattern is None or fnmatch.fnmatch(relPath, pattern):
+                    yield relPath
+
+
+class DirectoryPairing:
+    """
+    Pairs the files of two directory trees, by relative path or by pairKey: a
+    regular expression searched in the relative path, whose first group (or
+    whole match if it has no groups) is the key. Files whose path does not
+    match pairKey can't be paired.
+
+    Without pairKey, both trees are scanned at the same time and a pair is yielded
+    as soon as both of its files have been seen, so the work on the first pairs can
+    start before the scan finishes. With pairKey, several files of a tree can have
+    the same key, so the pairs are only yielded once both scans are over.
+    Once the iteration is over, unmatchedList1 and unmatchedList2 hold the files
+    that could not be paired (no counterpart, no key, or a key shared by several
+    files of the same tree, in which case none of them is paired).
+    """
+
+    def __init__(self, dirPath1, dirPath2, pattern=None, pairKey=None):
+        self.dirPathList = [dirPath1, dirPath2]
+        self.pattern = pattern
+        self.pairKeyRegex = re.compile(pairKey) if pairKey else None
+        self.unmatchedList1 = []
+        self.unmatchedList2 = []
+
+    def getKey(self, relPath):
+        if self.pairKeyRegex is None: return relPath
+        match = self.pairKeyRegex.search(relPath)
+        if match is None: return None
+        return match.group(1) if match.groups() else match.group(0)
+
+    def __iter__(self):
+        if self.pairKeyRegex is None:
+            yield from self.iterByRelPath()
+        else:
+            yield from self.iterByPairKey()
+
+    def iterByRelPath(self):
+        # Relative paths are unique within a tree, a pair is complete as soon as both files are seen
+        scanList = [scanDirectory(dirPath, self.pattern) for dirPath in self.dirPathList]
+        pendingDictList = [{}, {}]
+
+        activeSideList = [0, 1]
+        while activeSideList:
+            for side in list(activeSideList):
+                relPath = next(scanList[side], None)
+                if relPath is None:
+                    activeSideList.remove(side)
+                    continue
+
+                filePath = os.path.join(self.dirPathList[side], relPath)
+                if relPath in pendingDictList[1 - side]:
+                    otherFilePath = pendingDictList[1 - side].pop(relPath)
+                    yield (filePath, otherFilePath) if side == 0 else (otherFilePath, filePath)
+                else:
+                    pendingDictList[side][relPath] = filePath
+
+        self.unmatchedList1 = sorted(pendingDictList[0].values())
+        self.unmatchedList2 = sorted(pendingDictList[1].values())
+
+    def iterByPairKey(self):
+        # A key is only known to be unique once the whole tree is scanned
+        keyDictList = [{}, {}]
+        unmatchedListList = [[], []]
+        for side, dirPath in enumerate(self.dirPathList):
+            for relPath in scanDirectory(dirPath, self.pattern):
+                filePath = os.path.join(dirPath, relPath)
+                key = self.getKey(relPath)
+                if key is None:
+                    unmatchedListList[side].append(filePath)
+                else:
+                    keyDictList[side].setdefault(key, []).append(filePath)
+
+        for key, filePathList1 in keyDictList[0].items():
+            filePathList2 = keyDictList[1].get(key, [])
+            if len(filePathList1) == 1 and len(filePathList2) == 1:
+                yield filePathList1[0], filePathList2[0]
+            else:
+                unmatchedListList[0] += filePathList1
+                unmatchedListList[1] += filePathList2
+        for key, filePathList2 in keyDictList[1].items():
+            if key not in keyDictList[0]: unmatchedListList[1] += filePathList2
+
+        self.unmatchedList1 = sorted(unmatchedListList[0])
+        self.unmatchedList2 = sorted(unmatchedListList[1])
+
+
+def isDirectoryInput(filePathList):
+    return len(filePathList) == 1 and os.path.isdir(filePathList[0])
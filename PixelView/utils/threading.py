@@ -13,7 +13,11 @@
 # limitations under the License.
 
 
+import enum
+import heapq
+import itertools
 import threading
+from concurrent.futures import Future
 
 
 class OneShotThread(threading.Thread):
@@ -28,3 +32,110 @@ class OneShotThread(threading.Thread):
             self.returnData = self.oneShotFunc()
         else:
             self.returnData = self.oneShotFunc(**self.inputData)
+
+
+@enum.unique
+class PRIORITY(enum.IntEnum):
+    HIGH = 1
+    LOW = 2
+
+
+class WorkerPool:
+    """
+    Bounded pool of worker threads running tasks by priority (then submission order)
+
+    Tasks can be tagged with a generation. Once newGeneration() is called, the
+    tasks of older generations that have not started yet are cancelled, so
+    navigating away does not leave a backlog of loads nobody will look at.
+    LOW priority tasks never take more than workerCount - 1 workers (when
+    there is more than one), keeping a worker free for the HIGH ones.
+
+    A task can split its work with runInParallel, whose other half goes
+    to the pool with the priority and generation of the task itself.
+    """
+
+    def __init__(self, workerCount=2):
+        self.workerCount = max(workerCount, 1)
+        self.lowPriorityWorkerCount = max(self.workerCount - 1, 1)
+        self.condition = threading.Condition()
+        self.taskHeap = []
+        self.counter = itertools.count()
+        self.generation = 0
+        self.runningLowCount = 0
+        self.threadList = []
+        # (priority, generation) of the task run by the current worker thread
+        self.taskContext = threading.local()
+
+    def newGeneration(self):
+        with self.condition:
+            self.generation += 1
+            for priority, order, generation, future, func in self.taskHeap:
+                if generation is not None and generation < self.generation:
+                    future.cancel()
+            return self.generation
+
+    def submit(self, func, priority=PRIORITY.HIGH, generation=None):
+        """
+        Args:
+            func: Callable taking no arguments
+            priority: PRIORITY of the task
+            generation: Generation the task belongs to, None for tasks that never go stale
+
+        Returns:
+            A concurrent.futures.Future with the result of func
+        """
+        future = Future()
+        with self.condition:
+            heapq.heappush(self.taskHeap, (priority, next(self.counter), generation, future, func))
+            if len(self.threadList) < self.workerCount:
+                thread = threading.Thread(target=self.workerLoop, daemon=True)
+                self.threadList.append(thread)
+                thread.start()
+            self.condition.notify_all()
+        return future
+
+    def popTask(self):
+        # Must be called with self.condition held
+        while True:
+            while self.taskHeap and self.taskHeap[0][3].cancelled():
+                heapq.heappop(self.taskHeap)
+
+            if self.taskHeap:
+                priority = self.taskHeap[0][0]
+                if priority is not PRIORITY.LOW or self.runningLowCount < self.lowPriorityWorkerCount:
+                    return heapq.heappop(self.taskHeap)
+            self.condition.wait()
+
+    def workerLoop(self):
+        while True:
+            with self.condition:
+                priority, order, generation, future, func = self.popTask()
+                if priority is PRIORITY.LOW: self.runningLowCount += 1
+
+            self.taskContext.priority = priority
+            self.taskContext.generation = generation
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func())
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.condition:
+                    if priority is PRIORITY.LOW: self.runningLowCount -= 1
+                    self.condition.notify_all()
+
+    def runInParallel(self, func1, func2):
+        """
+        Returns (func1(), func2()), func1 running on the pool while func2 runs in
+        the calling thread. Called from a task of the pool, func1 gets the priority
+        and generation of that task (HIGH and no generation otherwise).
+        If func1 has not started by the time func2 is done, it is run in the calling
+        thread instead, so a task waiting on another never blocks the pool
+        """
+        priority = getattr(self.taskContext, 'priority', PRIORITY.HIGH)
+        generation = getattr(self.taskContext, 'generation', None)
+        future = self.submit(func1, priority=priority, generation=generation)
+        result2 = func2()
+        if future.cancel(): return func1(), result2
+        return future.result(), result2
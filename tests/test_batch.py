@@ -0,0 +1,63 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import pytest
+from PIL import Image
+from PixelView.utils.batch import runBatchCompare
+from PixelView.imageContainers.rgb888Image import Rgb888Image
+
+
+def savePNG(filePath, array):
+    Image.fromarray(array).save(filePath)
+    return str(filePath)
+
+
+@pytest.fixture
+def pairFileDict(tmp_path):
+    rng = np.random.default_rng(0)
+    rgbArray = rng.integers(0, 256, size=(8, 6, 3), dtype=np.uint8)
+    rgbaArray = np.concatenate([rgbArray, np.full((8, 6, 1), 0xFF, dtype=np.uint8)], axis=2)
+    changedArray = rgbArray.copy()
+    changedArray[2, 3, 1] ^= 0x10
+
+    rawFilePath = str(tmp_path / 'rgb.rgb')
+    Rgb888Image(bytearray(rgbArray.tobytes()), 6, 8).save(rawFilePath)
+    return {'rgb':     savePNG(tmp_path / 'rgb.png', rgbArray),
+            'rgbRaw':  rawFilePath,
+            'rgba':    savePNG(tmp_path / 'rgba.png', rgbaArray),
+            'changed': savePNG(tmp_path / 'changed.png', changedArray),
+            'missing': str(tmp_path / 'missing.png')}
+
+
+@pytest.mark.parametrize('workerCount', [1, 2])
+def test_statuses(pairFileDict, workerCount):
+    t = pairFileDict
+    rowList = list(runBatchCompare([t['rgb'], t['rgb'], t['rgba'], t['missing']],
+                                   [t['rgbRaw'], t['changed'], t['rgbRaw'], t['rgb']], workerCount=workerCount, chunkSize=1))
+
+    assert [row['index'] for row in rowList] == [0, 1, 2, 3]
+    assert [row['status'] for row in rowList] == ['equal', 'different', 'error', 'error']
+    assert rowList[1]['pixelDiffCount'] == 1
+    assert rowList[1]['maxChannelDelta'] == 0x10
+    # Alpha in only one of the images is reported, not raised
+    assert rowList[2]['msg'] == 'Alpha in only one of the images'
+
+
+def test_unordered(pairFileDict):
+    t = pairFileDict
+    rowList = list(runBatchCompare([t['rgb']] * 5, [t['changed']] * 5, workerCount=2, chunkSize=2, isOrdered=False))
+    assert sorted([row['index'] for row in rowList]) == list(range(5))
+    assert set([row['status'] for row in rowList]) == {'different'}
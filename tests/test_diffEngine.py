@@ -0,0 +1,147 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import zlib
+import itertools
+import numpy as np
+import pytest
+from PixelView.imageContainers.rgb888Image import Rgb888Image
+from PixelView.imageContainers.rgba8888Image import Rgba8888Image
+from PixelView.imageContainers.common import COMPARE_TYPE, DIFF_ENGINE, Geometry
+from PixelView.imageContainers.diffEngine import findFirstRawDiff, getColorLut, getDefaultTileHeight
+
+
+COLOR_DICT = {'0': [0x00, 0x00, 0x00], '1': [0x00, 0xFF, 0x00], '2': [0x00, 0x00, 0xFF], 'default': [0xFF, 0xFF, 0xFF]}
+
+IMAGE_CLASS_PAIR_LIST = [(Rgb888Image, Rgb888Image), (Rgb888Image, Rgba8888Image), (Rgba8888Image, Rgba8888Image)]
+
+GEOMETRY_PAIR_LIST = [
+    (None, None),
+    (Geometry(0, 0, 5, 4), Geometry(2, 3, 5, 4)),
+    (Geometry(1, 1, 10, 8), Geometry(0, 1, 10, 8)),
+]
+
+
+def genImage(rng, imageClass, width, height, sparseDiffSrc=None, sparseDiffCount=0):
+    """
+    Random image with small channel values (so deltas of 1 and 2 are common), and alpha
+    values that exercise every compareType mask. With sparseDiffSrc, a copy of that
+    image with sparseDiffCount bytes changed instead
+    """
+    bytesPerPixel = 4 if imageClass is Rgba8888Image else 3
+    if sparseDiffSrc is not None:
+        data = bytearray(sparseDiffSrc.data)
+        for i in rng.integers(0, len(data), size=sparseDiffCount):
+            data[i] = (data[i] + 1) % 256
+        return imageClass(data, width, height)
+
+    data = rng.integers(0, 4, size=width * height * bytesPerPixel, dtype=np.uint8)
+    if bytesPerPixel == 4:
+        data[3::4] = rng.choice([0, 1, 255], size=width * height)
+    return imageClass(bytearray(data), width, height)
+
+
+def genImagePair(seed, imageClass1, imageClass2, sparseDiffCount=None):
+    rng = np.random.default_rng(seed)
+    img1 = genImage(rng, imageClass1, 13, 10)
+    if sparseDiffCount is not None and imageClass1 is imageClass2:
+        return img1, genImage(rng, imageClass2, 13, 10, img1, sparseDiffCount)
+    return img1, genImage(rng, imageClass2, 13, 10)
+
+
+def getCaseList():
+    caseList = []
+    for (imageClass1, imageClass2), compareType, (geometry1, geometry2) in itertools.product(IMAGE_CLASS_PAIR_LIST, COMPARE_TYPE, GEOMETRY_PAIR_LIST):
+        for sparseDiffCount in [None, 0, 1, 3]:
+            caseList.append((imageClass1, imageClass2, compareType, geometry1, geometry2, sparseDiffCount))
+    return caseList
+
+
+def getCaseId(case):
+    imageClass1, imageClass2, compareType, geometry1, geometry2, sparseDiffCount = case
+    return '%s-%s-%s-%s-%s' % (imageClass1.__name__, imageClass2.__name__, compareType.name,
+                               'geometry' if geometry1 else 'full', 'random' if sparseDiffCount is None else 'sparse%i' % sparseDiffCount)
+
+
+def getSeed(case):
+    # Stable across runs (unlike hash() of a str)
+    return zlib.crc32(getCaseId(case).encode())
+
+
+@pytest.mark.parametrize('case', getCaseList(), ids=getCaseId)
+@pytest.mark.parametrize('stopOnDiff', [False, True])
+@pytest.mark.parametrize('returnFailPixelList', [False, True])
+def test_numpyMatchesReference(case, stopOnDiff, returnFailPixelList):
+    imageClass1, imageClass2, compareType, geometry1, geometry2, sparseDiffCount = case
+    img1, img2 = genImagePair(getSeed(case), imageClass1, imageClass2, sparseDiffCount)
+
+    kwargs = dict(geometry1=geometry1, geometry2=geometry2, stopOnDiff=stopOnDiff, compareType=compareType,
+                  returnFailPixelList=returnFailPixelList, colorDict=COLOR_DICT)
+    reference = img1.getDiff(img2, engine=DIFF_ENGINE.REFERENCE, **kwargs)
+
+    # DiffPixelList compares equal to the reference lists, delta images are compared byte for byte
+    for tileHeight, workerCount in [(None, 1), (1, 1), (3, 2), (4, 4)]:
+        result = img1.getDiff(img2, engine=DIFF_ENGINE.NUMPY, tileHeight=tileHeight, workerCount=workerCount, **kwargs)
+        assert result == reference, (tileHeight, workerCount)
+
+
+@pytest.mark.parametrize('imageClass1, imageClass2', IMAGE_CLASS_PAIR_LIST)
+@pytest.mark.parametrize('compareType', COMPARE_TYPE)
+def test_identicalImages(imageClass1, imageClass2, compareType):
+    img1, _ = genImagePair(7, imageClass1, imageClass2)
+    for returnFailPixelList in [False, True]:
+        reference = img1.getDiff(img1, engine=DIFF_ENGINE.REFERENCE, compareType=compareType, returnFailPixelList=returnFailPixelList)
+        assert img1.getDiff(img1, engine=DIFF_ENGINE.NUMPY, compareType=compareType, returnFailPixelList=returnFailPixelList) == reference
+
+
+@pytest.mark.parametrize('case', getCaseList(), ids=getCaseId)
+def test_statsMatchReference(case):
+    imageClass1, imageClass2, compareType, geometry1, geometry2, sparseDiffCount = case
+    img1, img2 = genImagePair(getSeed(case), imageClass1, imageClass2, sparseDiffCount)
+
+    reference = img1.getDiff(img2, engine=DIFF_ENGINE.REFERENCE, geometry1=geometry1, geometry2=geometry2, compareType=compareType)
+    stats = img1.getDiffStats(img2, geometry1=geometry1, geometry2=geometry2, compareType=compareType, tileHeight=3, workerCount=2)
+
+    if 'pixelDiffCount' not in reference:
+        assert stats == reference
+        return
+    for key in ['isDiff', 'pixelDiffCount', 'absDiffCount', 'maxChannelDelta']:
+        assert stats[key] == reference[key], key
+
+
+@pytest.mark.parametrize('case', getCaseList(), ids=getCaseId)
+def test_recolorAtToleranceZero(case):
+    imageClass1, imageClass2, compareType, geometry1, geometry2, sparseDiffCount = case
+    img1, img2 = genImagePair(getSeed(case), imageClass1, imageClass2, sparseDiffCount)
+
+    kwargs = dict(geometry1=geometry1, geometry2=geometry2, compareType=compareType, returnFailPixelList=True, colorLut=getColorLut(COLOR_DICT))
+    result = img1.getDiff(img2, returnDeltaPlanes=True, **kwargs)
+    if 'rgbDeltaPlane' not in result: return
+
+    recolored = img1.recolorDiff(img2, result, tolerance=0, colorLut=getColorLut(COLOR_DICT))
+    expected = img1.getDiff(img2, **kwargs)
+    for key, value in expected.items():
+        assert recolored[key] == value, key
+
+
+@pytest.mark.parametrize('width', [1, 1000, 2 ** 21])
+def test_findFirstRawDiffDefaultBands(width):
+    assert getDefaultTileHeight(width) * width <= max(2 ** 20, width)
+    height = 2 ** 21 // width + 2
+    array1 = np.zeros((height, width, 3), dtype=np.uint8)
+    array2 = array1.copy()
+    assert findFirstRawDiff(array1, array2) is None
+    array2[height - 1, width // 2, 1] = 1
+    assert findFirstRawDiff(array1, array2) == (width // 2, height - 1)
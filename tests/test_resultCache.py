@@ -0,0 +1,66 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+from PIL import Image
+from PixelView.utils.image import loadImage
+from PixelView.utils.resultCache import ResultCache, getDiffCached
+
+
+def savePNG(filePath, array):
+    Image.fromarray(array).save(filePath)
+    return str(filePath)
+
+
+def test_getDiffCached(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    array1 = rng.integers(0, 256, size=(8, 6, 3), dtype=np.uint8)
+    array2 = array1.copy()
+    array2[2, 3, 1] ^= 0x10
+    img1 = loadImage(savePNG(tmp_path / 'image1.png', array1))
+    img2 = loadImage(savePNG(tmp_path / 'image2.png', array2))
+    resultCache = ResultCache(str(tmp_path / 'cache'), 2 ** 20)
+
+    # The key is computed once per call, on a miss as on a hit
+    getKeyCallList = []
+    getKey = resultCache.getKey
+    monkeypatch.setattr(resultCache, 'getKey', lambda *args, **kwargs: getKeyCallList.append(args) or getKey(*args, **kwargs))
+    data = getDiffCached(resultCache, img1, img2, returnFailPixelList=True)
+    cachedData = getDiffCached(resultCache, img1, img2, returnFailPixelList=True)
+    assert len(getKeyCallList) == 2
+
+    assert cachedData['isDiff'] and data['isDiff']
+    assert cachedData['deltaImageRgbData'] == data['deltaImageRgbData']
+    assert list(cachedData['diffPixelRgbList'].positionArray) == list(data['diffPixelRgbList'].positionArray)
+    resultCache.close()
+
+
+def test_trimFileDigests(tmp_path):
+    resultCache = ResultCache(str(tmp_path / 'cache'), 2 ** 20, maxDigestCount=2)
+    filePathList = []
+    for i in range(4):
+        filePathList.append(str(tmp_path / ('file%d' % i)))
+        with open(filePathList[-1], 'wb') as f:
+            f.write(bytes([i]))
+
+    for filePath in filePathList:
+        resultCache.getFileDigest(filePath)
+    # A hit makes file0 the most recently used
+    resultCache.getFileDigest(filePathList[0])
+    resultCache.trim()
+
+    rowList = resultCache.db.execute('SELECT filePath FROM fileDigest ORDER BY filePath').fetchall()
+    assert [row[0] for row in rowList] == [filePathList[0], filePathList[3]]
+    resultCache.close()
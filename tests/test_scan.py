@@ -0,0 +1,59 @@
+# Copyright (c) 2020, NVIDIA CORPORATION. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+from PixelView.utils.scan import DirectoryPairing
+
+
+def touchFiles(dirPath, relPathList):
+    for relPath in relPathList:
+        filePath = os.path.join(str(dirPath), relPath)
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        open(filePath, 'w').close()
+    return str(dirPath)
+
+
+def test_pairByRelPath(tmp_path):
+    dirPath1 = touchFiles(tmp_path / 'k1', ['a.png', 'sub/b.png', 'only1.png'])
+    dirPath2 = touchFiles(tmp_path / 'k2', ['a.png', 'sub/b.png', 'only2.png', 'c.txt'])
+
+    pairing = DirectoryPairing(dirPath1, dirPath2, pattern='*.png')
+    pairList = sorted(pairing)
+    assert pairList == [(os.path.join(dirPath1, 'a.png'), os.path.join(dirPath2, 'a.png')),
+                        (os.path.join(dirPath1, 'sub/b.png'), os.path.join(dirPath2, 'sub/b.png'))]
+    assert pairing.unmatchedList1 == [os.path.join(dirPath1, 'only1.png')]
+    assert pairing.unmatchedList2 == [os.path.join(dirPath2, 'only2.png')]
+
+
+def test_pairByPairKey(tmp_path):
+    dirPath1 = touchFiles(tmp_path / 'k1', ['a_1.png', 'a_2.png', 'nokey.png'])
+    dirPath2 = touchFiles(tmp_path / 'k2', ['x_1.png', 'x_2.png', 'x_3.png'])
+
+    pairing = DirectoryPairing(dirPath1, dirPath2, pairKey=r'_(\d+)\.')
+    assert sorted(pairing) == [(os.path.join(dirPath1, 'a_1.png'), os.path.join(dirPath2, 'x_1.png')),
+                               (os.path.join(dirPath1, 'a_2.png'), os.path.join(dirPath2, 'x_2.png'))]
+    assert pairing.unmatchedList1 == [os.path.join(dirPath1, 'nokey.png')]
+    assert pairing.unmatchedList2 == [os.path.join(dirPath2, 'x_3.png')]
+
+
+def test_duplicatedPairKey(tmp_path):
+    # Every file of a key found more than once in a tree is unmatched, none of them is paired
+    dirPath1 = touchFiles(tmp_path / 'k1', ['a_1.png', 'b_1.png', 'a_2.png'])
+    dirPath2 = touchFiles(tmp_path / 'k2', ['x_1.png', 'y_1.png', 'x_2.png'])
+
+    pairing = DirectoryPairing(dirPath1, dirPath2, pairKey=r'_(\d+)\.')
+    assert list(pairing) == [(os.path.join(dirPath1, 'a_2.png'), os.path.join(dirPath2, 'x_2.png'))]
+    assert pairing.unmatchedList1 == [os.path.join(dirPath1, 'a_1.png'), os.path.join(dirPath1, 'b_1.png')]
+    assert pairing.unmatchedList2 == [os.path.join(dirPath2, 'x_1.png'), os.path.join(dirPath2, 'y_1.png')]